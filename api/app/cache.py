@@ -0,0 +1,175 @@
+"""In-process response cache keyed by route, normalized query params and data version.
+
+The loader bumps md_data.data_version after every load that changes data. Cached
+responses and ETags carry that version, so a bump invalidates both; clients that
+send If-None-Match with a current ETag get a 304 without touching the database.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+
+from .db import afetch_one
+from .deps import get_settings
+
+CachedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+def normalize_key(path: str, query_string: bytes) -> str:
+	"""Route plus sorted, stripped, non-empty query params."""
+	params = sorted(
+		(k, v.strip())
+		for k, v in parse_qsl(query_string.decode("latin-1"))
+		if v.strip()
+	)
+	return f"{path.rstrip('/') or '/'}?{urlencode(params)}"
+
+
+def make_etag(version: int, key: str) -> str:
+	return f'"{version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+	tags = [t.strip() for t in if_none_match.split(",")]
+	return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+	"""LRU of response bodies capped at max_bytes, cleared when the data version changes.
+
+	A single entry may take at most max_entry_bytes (a sixteenth of the cache by default),
+	so one large response cannot push most of the others out.
+	"""
+
+	def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+		self.max_bytes = max_bytes
+		self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 16
+		self.size = 0
+		self.version: Optional[int] = None
+		self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+		self._lock = threading.Lock()
+
+	def _sync_version(self, version: int) -> None:
+		if version != self.version:
+			self._entries.clear()
+			self.size = 0
+			self.version = version
+
+	def get(self, key: str, version: int) -> Optional[CachedResponse]:
+		with self._lock:
+			self._sync_version(version)
+			entry = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+			return entry
+
+	def put(self, key: str, version: int, entry: CachedResponse) -> None:
+		cost = len(entry[2]) + len(key)
+		if cost > self.max_entry_bytes:
+			return
+		with self._lock:
+			self._sync_version(version)
+			old = self._entries.pop(key, None)
+			if old is not None:
+				self.size -= len(old[2]) + len(key)
+			self._entries[key] = entry
+			self.size += cost
+			while self.size > self.max_bytes:
+				old_key, old = self._entries.popitem(last=False)
+				self.size -= len(old[2]) + len(old_key)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+
+class DataVersion:
+	"""Current md_data.data_version, re-read at most every ttl seconds; None if unavailable."""
+
+	def __init__(self, ttl: float, reader: Optional[Callable[[], Awaitable[Optional[int]]]] = None):
+		self.ttl = ttl
+		self.reader = reader or self._read
+		self.value: Optional[int] = None
+		self.checked_at = float("-inf")
+
+	@staticmethod
+	async def _read() -> Optional[int]:
+		try:
+			row = await afetch_one("SELECT version FROM data_version")
+		except Exception:
+			return None
+		return int(row.version) if row else None
+
+	async def get(self) -> Optional[int]:
+		if time.monotonic() - self.checked_at >= self.ttl:
+			self.value = await self.reader()
+			self.checked_at = time.monotonic()
+		return self.value
+
+
+@lru_cache(maxsize=1)
+def get_data_version() -> DataVersion:
+	"""Process-wide data version tracker shared by the response cache and the catalog."""
+	return DataVersion(get_settings().CACHE_VERSION_TTL_SECONDS)
+
+
+class ResponseCacheMiddleware:
+	"""ASGI middleware serving cached GET responses and 304s for the given path prefixes."""
+
+	def __init__(self, app, cache: ResponseCache, version: DataVersion, paths: Sequence[str]):
+		self.app = app
+		self.cache = cache
+		self.version = version
+		self.paths = tuple(paths)
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.paths):
+			await self.app(scope, receive, send)
+			return
+
+		version = await self.version.get()
+		if version is None:
+			await self.app(scope, receive, send)
+			return
+
+		key = normalize_key(scope["path"], scope.get("query_string", b""))
+		etag = make_etag(version, key)
+		validators = [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
+
+		if_none_match = Headers(scope=scope).get("if-none-match")
+		if if_none_match and etag_matches(if_none_match, etag):
+			await send({"type": "http.response.start", "status": 304, "headers": validators})
+			await send({"type": "http.response.body", "body": b""})
+			return
+
+		cached = self.cache.get(key, version)
+		if cached is not None:
+			status, headers, body = cached
+			await send({"type": "http.response.start", "status": status, "headers": headers})
+			await send({"type": "http.response.body", "body": body})
+			return
+
+		start: Dict = {}
+		streamed = [False]
+
+		async def send_and_capture(message):
+			if message["type"] == "http.response.start":
+				message = dict(message)
+				if message["status"] == 200:
+					message["headers"] = [
+						(k, v) for k, v in message.get("headers", []) if k.lower() not in (b"etag", b"cache-control")
+					] + validators
+				start.update(message)
+			elif message["type"] == "http.response.body" and start.get("status") == 200 and not streamed[0]:
+				if message.get("more_body", False):
+					# streamed exports (format=ndjson|csv) pass through without being buffered
+					streamed[0] = True
+				else:
+					self.cache.put(key, version, (200, list(start["headers"]), message.get("body", b"")))
+			await send(message)
+
+		await self.app(scope, receive, send_and_capture)
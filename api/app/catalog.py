@@ -0,0 +1,127 @@
+"""Catalog introspection: which relations, columns and functions exist on the search path.
+
+Routes register their query plans in order of preference, each naming the objects it
+needs. The catalog is read once at startup and again when the data version changes,
+so each request runs exactly the one query its best available plan calls for, and
+/health can report what the preferred plans are missing.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException
+from .cache import get_data_version
+from .db import afetch_all
+
+# every route names counties through the counties table
+COUNTY_LOOKUP = {"counties": ("county_id", "county_name")}
+# county name filters (county_filter) also need the alias index and normalize function,
+# so plans only require them when a request filters by county
+COUNTY_FILTER_RELATIONS = {"county_aliases": ("alias", "county_id")}
+COUNTY_FILTER_FUNCTIONS = ("normalize_county_name",)
+
+
+@dataclass(frozen=True)
+class Plan:
+	name: str
+	relations: Dict[str, Tuple[str, ...]]
+	functions: Tuple[str, ...] = ()
+
+
+_routes: Dict[str, List[Plan]] = {}
+
+
+def register(route: str, plans: Sequence[Plan]) -> List[Plan]:
+	"""Declare a route's plans, most preferred first."""
+	_routes[route] = list(plans)
+	return _routes[route]
+
+
+@dataclass
+class Catalog:
+	relations: Dict[str, Set[str]] = field(default_factory=dict)
+	functions: Set[str] = field(default_factory=set)
+	version: Optional[int] = None
+
+	def missing(self, plan: Plan, county_filter: bool = False) -> List[str]:
+		relations = {**plan.relations, **COUNTY_FILTER_RELATIONS} if county_filter else plan.relations
+		functions = plan.functions + COUNTY_FILTER_FUNCTIONS if county_filter else plan.functions
+		out = []
+		for relation, columns in relations.items():
+			if relation not in self.relations:
+				out.append(relation)
+			else:
+				out.extend(f"{relation}.{c}" for c in columns if c not in self.relations[relation])
+		out.extend(f"{f}()" for f in functions if f not in self.functions)
+		return out
+
+	def choose(self, route: str, county_filter: bool = False) -> Optional[Plan]:
+		return next((p for p in _routes[route] if not self.missing(p, county_filter)), None)
+
+	def report(self) -> Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]:
+		"""Chosen plan per route (unfiltered), and what each route's preferred plan is missing, county filter included."""
+		plans = {}
+		missing = {}
+		for route, candidates in _routes.items():
+			chosen = self.choose(route)
+			plans[route] = chosen.name if chosen else None
+			gaps = self.missing(candidates[0], county_filter=True)
+			if gaps:
+				missing[route] = gaps
+		return plans, missing
+
+
+# relations on the search path, first schema wins, with their columns
+RELATIONS_SQL = """
+SELECT c.relname, a.attname
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE n.nspname = ANY (current_schemas(false))
+  AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND NOT EXISTS (
+	SELECT 1
+	FROM pg_class c2
+	JOIN pg_namespace n2 ON n2.oid = c2.relnamespace
+	WHERE c2.relname = c.relname
+	  AND c2.relkind IN ('r', 'p', 'v', 'm', 'f')
+	  AND array_position(current_schemas(false), n2.nspname::text) < array_position(current_schemas(false), n.nspname::text)
+  )
+"""
+
+FUNCTIONS_SQL = """
+SELECT DISTINCT p.proname
+FROM pg_proc p
+JOIN pg_namespace n ON n.oid = p.pronamespace
+WHERE n.nspname = ANY (current_schemas(false))
+"""
+
+_catalog: Optional[Catalog] = None
+
+
+async def load_catalog(version: Optional[int] = None) -> Catalog:
+	global _catalog
+	catalog = Catalog(version=version)
+	for r in await afetch_all(RELATIONS_SQL):
+		columns = catalog.relations.setdefault(r.relname, set())
+		if r.attname:
+			columns.add(r.attname)
+	catalog.functions = {r.proname for r in await afetch_all(FUNCTIONS_SQL)}
+	_catalog = catalog
+	return catalog
+
+
+async def get_catalog() -> Catalog:
+	"""The current catalog, re-read when the data version has moved since it was loaded."""
+	version = await get_data_version().get()
+	if _catalog is None or (version is not None and version != _catalog.version):
+		return await load_catalog(version)
+	return _catalog
+
+
+async def plan_for(route: str, county_filter: bool = False) -> Plan:
+	catalog = await get_catalog()
+	plan = catalog.choose(route, county_filter)
+	if plan is None:
+		# name what the best plan usable without the filter lacks, else the preferred one
+		gaps = catalog.missing(catalog.choose(route) or _routes[route][0], county_filter)
+		raise HTTPException(status_code=503, detail=f"Database is missing objects for {route}: {', '.join(gaps)}")
+	return plan
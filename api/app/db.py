@@ -1,10 +1,15 @@
-from typing import Optional, Sequence, Any, Dict
+import time
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional, Sequence, Any, Dict
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine, Row
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Connection, Engine, Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from .deps import get_settings, Settings
+from .metrics import instrument_engine, observe_pool_wait
 
 _engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
 
 
 def _build_database_url(settings: Settings) -> str:
@@ -18,45 +23,145 @@ def _build_database_url(settings: Settings) -> str:
 	return f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 
 
+def _engine_options(settings: Settings) -> Dict[str, Any]:
+	return {
+		"pool_pre_ping": True,
+		"pool_size": settings.DB_POOL_SIZE,
+		"max_overflow": settings.DB_MAX_OVERFLOW,
+		"pool_timeout": settings.DB_POOL_TIMEOUT,
+		"pool_recycle": settings.DB_POOL_RECYCLE,
+		"connect_args": {"options": f"-csearch_path={settings.DB_SEARCH_PATH}"},
+	}
+
+
 def get_engine() -> Engine:
 	global _engine
 	if _engine is None:
 		settings = get_settings()
 		db_url = _build_database_url(settings)
-		_engine = create_engine(
-			db_url,
-			pool_pre_ping=True,
-			pool_size=5,
-			max_overflow=10,
-			future=True,
-		)
+		_engine = create_engine(db_url, future=True, **_engine_options(settings))
+		instrument_engine(_engine, "sync")
 	return _engine
 
 
+def get_async_engine() -> AsyncEngine:
+	# the psycopg (v3) dialect runs on its async connection under create_async_engine
+	global _async_engine
+	if _async_engine is None:
+		settings = get_settings()
+		db_url = _build_database_url(settings)
+		_async_engine = create_async_engine(db_url, **_engine_options(settings))
+		instrument_engine(_async_engine.sync_engine, "async")
+	return _async_engine
+
+
+def engines() -> Dict[str, Engine]:
+	"""Engines created so far, by the name their metrics are labelled with."""
+	out = {}
+	if _engine is not None:
+		out["sync"] = _engine
+	if _async_engine is not None:
+		out["async"] = _async_engine.sync_engine
+	return out
+
+
+@contextmanager
+def _connect() -> Iterator[Connection]:
+	start = time.perf_counter()
+	with get_engine().connect() as conn:
+		observe_pool_wait("sync", time.perf_counter() - start)
+		yield conn
+
+
+@asynccontextmanager
+async def _aconnect() -> AsyncIterator[AsyncConnection]:
+	start = time.perf_counter()
+	async with get_async_engine().connect() as conn:
+		observe_pool_wait("async", time.perf_counter() - start)
+		yield conn
+
+
 def fetch_all(sql: str, params: Optional[Dict[str, Any]] = None) -> Sequence[Row]:
-	engine = get_engine()
-	with engine.connect() as conn:
+	with _connect() as conn:
 		result = conn.execute(text(sql), params or {})
 		return result.fetchall()
 
 
 def fetch_one(sql: str, params: Optional[Dict[str, Any]] = None) -> Optional[Row]:
-	engine = get_engine()
-	with engine.connect() as conn:
+	with _connect() as conn:
 		result = conn.execute(text(sql), params or {})
 		row = result.fetchone()
 		return row
 
 
-def try_queries(queries: Sequence[str], params: Optional[Dict[str, Any]] = None) -> Sequence[Row]:
-	last_err: Optional[Exception] = None
-	for q in queries:
-		try:
-			return fetch_all(q, params)
-		except SQLAlchemyError as e:
-			last_err = e
-	if last_err:
-		raise last_err
-	return []
+async def afetch_all(sql: str, params: Optional[Dict[str, Any]] = None) -> Sequence[Row]:
+	if not get_settings().DB_ASYNC:
+		return await run_in_threadpool(fetch_all, sql, params)
+	async with _aconnect() as conn:
+		result = await conn.execute(text(sql), params or {})
+		return result.fetchall()
+
+
+async def afetch_one(sql: str, params: Optional[Dict[str, Any]] = None) -> Optional[Row]:
+	if not get_settings().DB_ASYNC:
+		return await run_in_threadpool(fetch_one, sql, params)
+	async with _aconnect() as conn:
+		result = await conn.execute(text(sql), params or {})
+		return result.fetchone()
+
+
+async def astream(sql: str, params: Optional[Dict[str, Any]] = None, batch_rows: int = 1000) -> AsyncIterator[Sequence[Row]]:
+	"""Open a server-side cursor for sql and return an async iterator of row batches.
+	The connection stays checked out until the iterator is exhausted."""
+	stack = AsyncExitStack()
+	try:
+		if get_settings().DB_ASYNC:
+			conn = await stack.enter_async_context(_aconnect())
+			result = await conn.stream(text(sql), params or {})
+			batches = result.partitions(batch_rows)
+		else:
+			connect = _connect()
+			conn = await run_in_threadpool(connect.__enter__)
+			stack.push_async_callback(run_in_threadpool, connect.__exit__, None, None, None)
+			result = await run_in_threadpool(
+				conn.execution_options(stream_results=True, yield_per=batch_rows).execute, text(sql), params or {}
+			)
+			batches = iterate_in_threadpool(result.partitions(batch_rows))
+	except BaseException:
+		await stack.aclose()
+		raise
+	return _drain(stack, batches)
+
+
+async def _drain(stack: AsyncExitStack, batches: AsyncIterator[Sequence[Row]]) -> AsyncIterator[Sequence[Row]]:
+	async with stack:
+		async for batch in batches:
+			yield batch
+
+
+async def dispose_engines() -> None:
+	global _engine, _async_engine
+	if _async_engine is not None:
+		await _async_engine.dispose()
+		_async_engine = None
+	if _engine is not None:
+		_engine.dispose()
+		_engine = None
+
 
+def county_filter(id_column: str, param: str = "county") -> str:
+	"""SQL predicate matching county ids by alias for the normalized :param.
 
+	Uses the county_aliases index and normalize_county_name() written by the
+	loader, so "Prince Georges", "St. Mary's County" and "baltimore city" match.
+	An exact alias match wins, so "Baltimore County" does not also match
+	"baltimore city"; aliases containing the name are used only when none
+	matches exactly.
+	"""
+	name = f"normalize_county_name(:{param})"
+	return (
+		f"{id_column} IN (SELECT ca.county_id FROM county_aliases ca "
+		f"WHERE ca.alias = {name} "
+		f"OR (ca.alias LIKE '%' || {name} || '%' "
+		f"AND NOT EXISTS (SELECT 1 FROM county_aliases ex WHERE ex.alias = {name})))"
+	)
@@ -1,8 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import health, counties, enforcements, wages
+from .routers import health, counties, enforcements, wages, metrics
 from .reports import overview
 from .deps import get_settings
+from .cache import ResponseCache, ResponseCacheMiddleware, get_data_version
+from .db import dispose_engines
+from .metrics import MetricsMiddleware
+from .probe import get_health_probe
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# the first probe also reads the catalog, so /health is accurate from the
+	# first request; if the DB is down the probe and the routes keep retrying
+	probe = get_health_probe()
+	await probe.probe_once()
+	probe.start()
+	yield
+	await probe.stop()
+	await dispose_engines()
 
 
 def create_app() -> FastAPI:
@@ -10,10 +27,21 @@ def create_app() -> FastAPI:
 	app = FastAPI(
 		title=settings.API_TITLE,
 		version=settings.API_VERSION,
+		debug=settings.DEBUG,
 		docs_url="/docs",
 		redoc_url="/redoc",
+		lifespan=lifespan,
 	)
 
+	# Response cache with ETag/304, inside CORS so every response gets CORS headers
+	if settings.CACHE_ENABLED:
+		app.add_middleware(
+			ResponseCacheMiddleware,
+			cache=ResponseCache(settings.CACHE_MAX_BYTES),
+			version=get_data_version(),
+			paths=[p.strip() for p in settings.CACHE_PATHS.split(",") if p.strip()],
+		)
+
 	# CORS (open by default; adjust via env if needed)
 	app.add_middleware(
 		CORSMiddleware,
@@ -23,12 +51,18 @@ def create_app() -> FastAPI:
 		allow_headers=[h.strip() for h in settings.ALLOW_HEADERS.split(",")] if settings.ALLOW_HEADERS else ["*"],
 	)
 
+	# Request metrics, outermost so cache hits and CORS preflights are timed too
+	if settings.METRICS_ENABLED:
+		app.add_middleware(MetricsMiddleware)
+
 	# Routers
 	app.include_router(health.router, prefix="", tags=["health"])
 	app.include_router(counties.router, prefix="/counties", tags=["counties"])
 	app.include_router(enforcements.router, prefix="/enforcements", tags=["enforcements"])
 	app.include_router(wages.router, prefix="/wages", tags=["wages"])
 	app.include_router(overview.router, prefix="/report", tags=["reports"])
+	if settings.METRICS_ENABLED:
+		app.include_router(metrics.router, prefix="", tags=["metrics"])
 
 	@app.get("/", summary="Root")
 	def root():
@@ -0,0 +1,190 @@
+"""Request, query and pool metrics in the Prometheus text format, without a client library.
+
+The middleware labels each request with its route template, so cardinality stays at the
+number of routes. DB queries are timed through engine events and attributed to the route
+that issued them via a context variable; pool gauges are read from the engines at scrape time.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import compile_path
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# route template of the request being served; queries outside a request count as background
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+	pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+	if extra:
+		pairs.append(extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+	def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+		self.name = name
+		self.help = help
+		self.labels = tuple(labels)
+		self.buckets = tuple(buckets)
+		self.bounds = tuple(f'le="{b}"' for b in self.buckets) + ('le="+Inf"',)
+		# per label set: [count per bucket..., +Inf count], sum
+		self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, labels: Labels, value: float) -> None:
+		i = bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(labels)
+			if series is None:
+				series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+			series[0][i] += 1
+			series[1][0] += value
+
+	def render(self) -> Iterable[str]:
+		yield f"# HELP {self.name} {self.help}"
+		yield f"# TYPE {self.name} histogram"
+		with self._lock:
+			snapshot = [(k, list(c), s[0]) for k, (c, s) in self._series.items()]
+		for labels, counts, total in sorted(snapshot):
+			values = tuple(_escape(v) for v in labels)
+			cumulative = 0
+			for bound, count in zip(self.bounds, counts):
+				cumulative += count
+				yield f"{self.name}_bucket{_format_labels(self.labels, values, bound)} {cumulative}"
+			yield f"{self.name}_sum{_format_labels(self.labels, values)} {total}"
+			yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+
+class Gauge:
+	def __init__(self, name: str, help: str, labels: Sequence[str]):
+		self.name = name
+		self.help = help
+		self.labels = tuple(labels)
+		self._values: Dict[Labels, float] = {}
+		self._lock = threading.Lock()
+
+	def add(self, labels: Labels, amount: float) -> None:
+		with self._lock:
+			self._values[labels] = self._values.get(labels, 0) + amount
+
+	def set(self, labels: Labels, value: float) -> None:
+		with self._lock:
+			self._values[labels] = value
+
+	def render(self) -> Iterable[str]:
+		yield f"# HELP {self.name} {self.help}"
+		yield f"# TYPE {self.name} gauge"
+		with self._lock:
+			snapshot = sorted(self._values.items())
+		for labels, value in snapshot:
+			yield f"{self.name}{_format_labels(self.labels, tuple(_escape(v) for v in labels))} {value:g}"
+
+
+REQUEST_LATENCY = Histogram(
+	"api_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"), REQUEST_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge("api_requests_in_progress", "Requests being served by route template.", ("method", "route"))
+QUERY_LATENCY = Histogram("api_db_query_duration_seconds", "DB query time by issuing route.", ("engine", "route"), QUERY_BUCKETS)
+POOL_WAIT = Histogram("api_db_pool_wait_seconds", "Time spent checking a connection out of the pool.", ("engine",), WAIT_BUCKETS)
+POOL_SIZE = Gauge("api_db_pool_size", "Configured pool size.", ("engine",))
+POOL_CHECKED_OUT = Gauge("api_db_pool_checked_out", "Connections currently checked out.", ("engine",))
+POOL_OVERFLOW = Gauge("api_db_pool_overflow", "Connections open beyond pool_size (negative while the pool fills).", ("engine",))
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+	"""Time every cursor execution on engine (for an AsyncEngine, pass its sync_engine)."""
+
+	@event.listens_for(engine, "before_cursor_execute")
+	def _start(conn, cursor, statement, parameters, context, executemany):
+		conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+	@event.listens_for(engine, "after_cursor_execute")
+	def _stop(conn, cursor, statement, parameters, context, executemany):
+		QUERY_LATENCY.observe((name, current_route.get()), time.perf_counter() - conn.info["query_start"].pop())
+
+	@event.listens_for(engine, "handle_error")
+	def _failed(exception_context):
+		conn = exception_context.connection
+		starts = conn.info.get("query_start") if conn is not None else None
+		if starts:
+			QUERY_LATENCY.observe((name, current_route.get()), time.perf_counter() - starts.pop())
+
+
+def observe_pool_wait(engine: str, seconds: float) -> None:
+	POOL_WAIT.observe((engine,), seconds)
+
+
+def render(engines: Dict[str, Engine]) -> str:
+	for name, engine in engines.items():
+		pool = engine.pool
+		if hasattr(pool, "checkedout"):
+			POOL_SIZE.set((name,), pool.size())
+			POOL_CHECKED_OUT.set((name,), pool.checkedout())
+			POOL_OVERFLOW.set((name,), pool.overflow())
+	lines: List[str] = []
+	for metric in (
+		REQUEST_LATENCY, REQUESTS_IN_PROGRESS, QUERY_LATENCY, POOL_WAIT, POOL_SIZE, POOL_CHECKED_OUT, POOL_OVERFLOW
+	):
+		lines.extend(metric.render())
+	return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+	"""ASGI middleware timing every HTTP request under its route template."""
+
+	def __init__(self, app):
+		self.app = app
+		self._templates: Optional[List[Tuple[Pattern, str]]] = None
+
+	def _route_for(self, scope) -> str:
+		# labels are the app's path templates, so unknown paths cannot add series
+		if self._templates is None:
+			app = scope["app"]
+			paths = list(app.openapi().get("paths", {})) if app.openapi_url else []
+			self._templates = [(compile_path(p)[0], p) for p in paths]
+		path = scope["path"]
+		for regex, template in self._templates:
+			if regex.match(path):
+				return template
+		return "other"
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		route = self._route_for(scope)
+		method = scope["method"]
+		status = [500]
+
+		async def send_and_record(message):
+			if message["type"] == "http.response.start":
+				status[0] = message["status"]
+			await send(message)
+
+		token = current_route.set(route)
+		REQUESTS_IN_PROGRESS.add((method, route), 1)
+		start = time.perf_counter()
+		try:
+			await self.app(scope, receive, send_and_record)
+		finally:
+			REQUEST_LATENCY.observe((method, route, str(status[0])), time.perf_counter() - start)
+			REQUESTS_IN_PROGRESS.add((method, route), -1)
+			current_route.reset(token)
@@ -0,0 +1,41 @@
+"""Keyset pagination: opaque cursors holding the sort key of the last row returned."""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import HTTPException
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+	raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+	return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+		values = json.loads(raw)
+	except ValueError:
+		values = None
+	if not isinstance(values, list) or len(values) != size:
+		raise HTTPException(status_code=400, detail="Invalid cursor")
+	return values
+
+
+def keyset_after(cursor: Optional[str], columns: Sequence[str], params: Dict[str, Any]) -> Optional[str]:
+	"""Row-value predicate selecting rows sorted after the cursor, e.g.
+	"(x.county, x.year) > (:after_0, :after_1)"; None without a cursor."""
+	if not cursor:
+		return None
+	values = decode_cursor(cursor, len(columns))
+	names = [f"after_{i}" for i in range(len(columns))]
+	params.update(zip(names, values))
+	return f"({', '.join(columns)}) > ({', '.join(':' + n for n in names)})"
+
+
+def next_cursor(items: List[Dict[str, Any]], keys: Sequence[str], limit: int) -> Optional[str]:
+	"""Cursor after the last item when a page was fetched with limit + 1 rows
+	and came back full; trims the extra row from items."""
+	if len(items) <= limit:
+		return None
+	del items[limit:]
+	return encode_cursor([items[-1][k] for k in keys])
@@ -0,0 +1,130 @@
+"""Background health probe, so /health answers from memory instead of taking a pool slot.
+
+A task started with the app checks the database on a fixed interval: the round-trip latency
+of one query, when the summaries last changed and when a load last completed (read from
+md_data.data_version on the database clock), and the query plans the catalog can serve.
+/health reports the latest result alongside the pool gauges, which are in-process counters.
+"""
+import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+from .catalog import get_catalog
+from .db import afetch_one, engines
+from .deps import get_settings
+
+
+@dataclass
+class ProbeResult:
+	checked_at: float  # time.monotonic()
+	ok: bool
+	error: Optional[str] = None
+	latency_ms: Optional[float] = None
+	data_version: Optional[int] = None
+	# ages on the database clock at checked_at
+	overview_age_seconds: Optional[float] = None
+	last_load_age_seconds: Optional[float] = None
+	query_plans: Dict[str, Optional[str]] = field(default_factory=dict)
+	missing_objects: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def freshness_sql(columns: Set[str]) -> str:
+	"""The probe query; older schemas without data_version (or loaded_at) report what they have."""
+	if "updated_at" not in columns:
+		return "SELECT now() AS db_now, NULL AS version, NULL AS updated_at, NULL AS loaded_at"
+	loaded_at = "loaded_at" if "loaded_at" in columns else "updated_at AS loaded_at"
+	return f"SELECT now() AS db_now, version, updated_at, {loaded_at} FROM data_version"
+
+
+def _age(now, then) -> Optional[float]:
+	return round((now - then).total_seconds(), 3) if then is not None else None
+
+
+class HealthProbe:
+	def __init__(self, interval: float, timeout: float):
+		self.interval = interval
+		self.timeout = timeout
+		self.last: Optional[ProbeResult] = None
+		self.last_ok: Optional[ProbeResult] = None
+		self._task: Optional[asyncio.Task] = None
+
+	async def _check(self) -> ProbeResult:
+		catalog = await get_catalog()
+		plans, missing = catalog.report()
+		sql = freshness_sql(catalog.relations.get("data_version", set()))
+		start = time.perf_counter()
+		row = await afetch_one(sql)
+		latency_ms = (time.perf_counter() - start) * 1000
+		return ProbeResult(
+			checked_at=time.monotonic(),
+			ok=True,
+			latency_ms=round(latency_ms, 3),
+			data_version=row.version,
+			overview_age_seconds=_age(row.db_now, row.updated_at) if "overview_agg" in catalog.relations else None,
+			last_load_age_seconds=_age(row.db_now, row.loaded_at),
+			query_plans=plans,
+			missing_objects=missing,
+		)
+
+	async def probe_once(self) -> ProbeResult:
+		try:
+			result = await asyncio.wait_for(self._check(), self.timeout)
+		except Exception as e:
+			# first line only; driver errors append the failing SQL and a docs link
+			detail = str(e).splitlines()[0] if str(e) else ""
+			error = f"{type(e).__name__}: {detail}" if detail else type(e).__name__
+			result = ProbeResult(checked_at=time.monotonic(), ok=False, error=error)
+		else:
+			self.last_ok = result
+		self.last = result
+		return result
+
+	async def _run(self) -> None:
+		while True:
+			await asyncio.sleep(self.interval)
+			await self.probe_once()
+
+	def start(self) -> None:
+		if self._task is None:
+			self._task = asyncio.create_task(self._run())
+
+	async def stop(self) -> None:
+		if self._task is not None:
+			self._task.cancel()
+			with suppress(asyncio.CancelledError):
+				await self._task
+			self._task = None
+
+	def connected(self) -> bool:
+		# a probe that has stopped reporting counts as a failed one
+		last = self.last
+		return last is not None and last.ok and time.monotonic() - last.checked_at <= 3 * self.interval + self.timeout
+
+
+def pool_status() -> Dict[str, Dict[str, float]]:
+	"""Checked-out connections against pool capacity, per engine created so far."""
+	max_overflow = get_settings().DB_MAX_OVERFLOW
+	out = {}
+	for name, engine in engines().items():
+		pool = engine.pool
+		if not hasattr(pool, "checkedout"):
+			continue
+		capacity = pool.size() + max(max_overflow, 0)
+		checked_out = pool.checkedout()
+		out[name] = {
+			"size": pool.size(),
+			"checked_out": checked_out,
+			"overflow": pool.overflow(),
+			"capacity": capacity,
+			"saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+		}
+	return out
+
+
+@lru_cache(maxsize=1)
+def get_health_probe() -> HealthProbe:
+	settings = get_settings()
+	return HealthProbe(settings.HEALTH_PROBE_INTERVAL_SECONDS, settings.HEALTH_PROBE_TIMEOUT_SECONDS)
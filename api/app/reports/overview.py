@@ -1,52 +1,53 @@
-from typing import List, Optional
+from typing import Literal, Optional
 from fastapi import APIRouter, Query
-from ..db import try_queries
-from ..schemas import OverviewResponse, OverviewItem
+from ..catalog import COUNTY_LOOKUP, Plan, plan_for, register
+from ..db import afetch_all, astream, county_filter
+from ..pagination import keyset_after, next_cursor
+from ..schemas import OverviewResponse
+from ..serialization import json_response
+from ..streaming import stream_rows
 
 router = APIRouter()
 
+DEFAULT_LIMIT = 1000
+COLUMNS = ["county", "year", "total_enforcements", "average_wage"]
 
-@router.get("/overview", response_model=OverviewResponse, summary="Aggregated overview (wages + enforcement counts)")
-def overview(
-    county: Optional[str] = Query(default=None),
-    year: Optional[int] = Query(default=None, ge=1900, le=2100),
-    limit: int = Query(default=1000, ge=1, le=10000),
-):
-    params = {"limit": limit}
-    wh = []
-    if county:
-        params["county"] = f"%{county}%"
-        wh.append("o.county ILIKE :county")
-    if year:
-        params["year"] = year
-        wh.append("o.year = :year")
-    where_sql = f"WHERE {' AND '.join(wh)}" if wh else ""
+register("overview", [
+    # summary table kept current by the loader
+    Plan("summary", {**COUNTY_LOOKUP,
+                     "overview_agg": ("county_id", "year", "total_enforcements", "average_wage")}),
+    # warehouse tables: typed dates with stored year columns
+    Plan("warehouse", {**COUNTY_LOOKUP,
+                       "air_enforcements_in_md": ("county_id", "year"),
+                       "water_enforcements_in_md": ("county_id", "year"),
+                       "average_wage_per_county": ("county_id", "year", "wage_for_county")}),
+    # legacy tables with text dates
+    Plan("legacy", {**COUNTY_LOOKUP,
+                    "air_enforcements_md": ("county_id", "achieved_date"),
+                    "water_enforcements_md": ("county_id", "case_closed"),
+                    "wages_per_county": ("county_id", "year", "wage_for_county")}),
+])
 
-    q_mv = f"""
-    SELECT
-        county,
-        year::int AS year,
-        total_enforcements::int AS total_enforcements,
-        average_wage::float AS average_wage
-    FROM mv_overview_agg o
-    {where_sql}
-    ORDER BY county, year
-    LIMIT :limit
-    """
 
-    q_fallback = f"""
+def _text_year(column: str) -> str:
+    return f"NULLIF(substring({column} FROM '^[0-9]{{4}}'), '')::int"
+
+
+def _base_query(air_table: str, water_table: str, wage_table: str,
+                air_year: str, water_year: str, where_sql: str) -> str:
+    return f"""
     WITH air AS (
         SELECT
             c.county_name AS county,
-            NULLIF(substring(a.achieved_date FROM '^[0-9]{{4}}'), '')::int AS year
-        FROM air_enforcements_md a
+            {air_year} AS year
+        FROM {air_table} a
         LEFT JOIN counties c ON c.county_id = a.county_id
     ),
     water AS (
         SELECT
             c.county_name AS county,
-            NULLIF(substring(w.case_closed FROM '^[0-9]{{4}}'), '')::int AS year
-        FROM water_enforcements_md w
+            {water_year} AS year
+        FROM {water_table} w
         LEFT JOIN counties c ON c.county_id = w.county_id
     ),
     enforcement_counts AS (
@@ -61,30 +62,96 @@ def overview(
     ),
     wages_norm AS (
         SELECT c.county_name AS county, w.year::int AS year, w.wage_for_county::float AS average_wage
-        FROM wages_per_county w
+        FROM {wage_table} w
         LEFT JOIN counties c ON c.county_id = w.county_id
     )
+    SELECT *
+    FROM (
+        SELECT
+            COALESCE(w.county, e.county) AS county,
+            COALESCE(w.year, e.year) AS year,
+            COALESCE(e.total_enforcements, 0)::int AS total_enforcements,
+            w.average_wage::float AS average_wage
+        FROM wages_norm w
+        FULL OUTER JOIN enforcement_counts e
+          ON e.county = w.county AND e.year = w.year
+    ) o
+    {where_sql}
+    ORDER BY county, year
+    LIMIT :limit
+    """
+
+
+def _item(r) -> dict:
+    return {
+        "county": r.county,
+        "year": int(r.year),
+        "total_enforcements": int(r.total_enforcements),
+        "average_wage": (float(r.average_wage) if getattr(r, "average_wage", None) is not None else None),
+    }
+
+
+@router.get(
+    "/overview",
+    response_model=OverviewResponse,
+    summary="Aggregated overview (wages + enforcement counts)",
+    description="Pages are ordered by (county, year); pass `next_cursor` as `cursor` to get the "
+    "next one. `format=ndjson|csv` streams every matching item (up to `limit` if given) from "
+    "a server-side cursor.",
+)
+async def overview(
+    county: Optional[str] = Query(default=None),
+    year: Optional[int] = Query(default=None, ge=1900, le=2100),
+    limit: Optional[int] = Query(default=None, ge=1, le=10000, description="page size, 1000 by default"),
+    cursor: Optional[str] = Query(default=None),
+    fmt: Literal["json", "ndjson", "csv"] = Query(default="json", alias="format"),
+):
+    page_size = limit or DEFAULT_LIMIT
+    # one extra row tells whether there is a next page
+    params = {"limit": limit if fmt != "json" else page_size + 1}
+    wh = []
+    wh_agg = []
+    if county:
+        params["county"] = county
+        wh.append(f"o.county IN (SELECT c.county_name FROM counties c WHERE {county_filter('c.county_id')})")
+        wh_agg.append(county_filter("o.county_id"))
+    if year:
+        params["year"] = year
+        wh.append("o.year = :year")
+        wh_agg.append("o.year = :year")
+    after = keyset_after(cursor, ["o.county", "o.year"], params)
+    if after:
+        wh.append(after)
+        wh_agg.append(after.replace("o.county", "c.county_name", 1))
+    where_sql = f"WHERE {' AND '.join(wh)}" if wh else ""
+    where_agg = f"WHERE {' AND '.join(wh_agg)}" if wh_agg else ""
+
+    # filtered on the summary table's key
+    q_agg = f"""
     SELECT
-        COALESCE(w.county, e.county) AS county,
-        COALESCE(w.year, e.year) AS year,
-        COALESCE(e.total_enforcements, 0)::int AS total_enforcements,
-        w.average_wage::float AS average_wage
-    FROM wages_norm w
-    FULL OUTER JOIN enforcement_counts e
-      ON e.county = w.county AND e.year = w.year
-    {where_sql.replace('o.', '')}
+        c.county_name AS county,
+        o.year,
+        o.total_enforcements,
+        o.average_wage
+    FROM overview_agg o
+    JOIN counties c ON c.county_id = o.county_id
+    {where_agg}
     ORDER BY county, year
     LIMIT :limit
     """
-    rows = try_queries([q_mv, q_fallback], params)
-    items: List[OverviewItem] = []
-    for r in rows:
-        items.append(
-            OverviewItem(
-                county=r.county,
-                year=int(r.year),
-                total_enforcements=int(r.total_enforcements),
-                average_wage=(float(r.average_wage) if getattr(r, "average_wage", None) is not None else None),
-            )
-        )
-    return OverviewResponse(items=items, count=len(items))
+
+    plan = await plan_for("overview", county_filter=bool(county))
+    if plan.name == "summary":
+        q = q_agg
+    elif plan.name == "warehouse":
+        q = _base_query("air_enforcements_in_md", "water_enforcements_in_md", "average_wage_per_county",
+                        "a.year", "w.year", where_sql)
+    else:
+        q = _base_query("air_enforcements_md", "water_enforcements_md", "wages_per_county",
+                        _text_year("a.achieved_date"), _text_year("w.case_closed"), where_sql)
+    if fmt != "json":
+        return stream_rows(await astream(q, params), _item, COLUMNS, fmt)
+
+    items = [_item(r) for r in await afetch_all(q, params)]
+    next_page = next_cursor(items, ["county", "year"], page_size)
+    return json_response({"items": items, "count": len(items), "next_cursor": next_page}, OverviewResponse)
@@ -1,31 +1,37 @@
 from typing import List, Optional
 from fastapi import APIRouter, Query
-from ..db import try_queries
+from ..catalog import COUNTY_LOOKUP, Plan, plan_for, register
+from ..db import afetch_all, county_filter
 from ..schemas import County
+from ..serialization import json_response
 
 router = APIRouter()
 
+register("counties", [Plan("counties", {**COUNTY_LOOKUP, "counties": ("county_id", "county_name", "state")})])
+
 @router.get("", response_model=List[County], summary="List counties")
-def list_counties(
+async def list_counties(
     name: Optional[str] = Query(default=None),
     limit: int = Query(default=200, ge=1, le=10000),
 ):
     params = {"limit": limit}
     where = []
     if name:
-        params["name"] = f"%{name}%"
-        where.append("c.county_name ILIKE :name")
+        params["name"] = name
+        where.append(county_filter("c.county_id", "name"))
     where_sql = f"WHERE {' AND '.join(where)}" if where else ""
-    rows = try_queries(
-        [
-            f"""
-            SELECT c.county_id, c.county_name, c.state
-            FROM counties c
-            {where_sql}
-            ORDER BY c.county_name
-            LIMIT :limit
-            """
-        ],
+    await plan_for("counties", county_filter=bool(name))
+    rows = await afetch_all(
+        f"""
+        SELECT c.county_id, c.county_name, c.state
+        FROM counties c
+        {where_sql}
+        ORDER BY c.county_name
+        LIMIT :limit
+        """,
         params,
     )
-    return [{"county_id": r.county_id, "county_name": r.county_name, "state": r.state} for r in rows]
+    return json_response(
+        [{"county_id": r.county_id, "county_name": r.county_name, "state": r.state} for r in rows],
+        List[County],
+    )
@@ -1,46 +1,56 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Query
-from ..db import try_queries
+from ..catalog import COUNTY_LOOKUP, Plan, plan_for, register
+from ..db import afetch_all, astream, county_filter
+from ..pagination import keyset_after, next_cursor
 from ..schemas import EnforcementSummary
+from ..serialization import json_response
+from ..streaming import stream_rows
 
 router = APIRouter()
 
+DEFAULT_LIMIT = 1000
+COLUMNS = ["county", "year", "total_enforcements", "source"]
+
+register("enforcements", [
+    # pre-aggregated rollup refreshed by the loader
+    Plan("rollup", {**COUNTY_LOOKUP,
+                    "enforcement_rollup": ("county_id", "year", "source", "category", "total_enforcements")}),
+    # warehouse tables: typed dates with stored year columns
+    Plan("warehouse", {**COUNTY_LOOKUP,
+                       "air_enforcements_in_md": ("county_id", "year"),
+                       "water_enforcements_in_md": ("county_id", "year", "media")}),
+    # legacy tables with text dates
+    Plan("legacy", {**COUNTY_LOOKUP,
+                    "air_enforcements_md": ("county_id", "achieved_date"),
+                    "water_enforcements_md": ("county_id", "case_closed", "media")}),
+])
+
+
+def _text_year(column: str) -> str:
+    return f"NULLIF(substring({column} FROM '^[0-9]{{4}}'), '')::int"
 
-@router.get("", response_model=List[EnforcementSummary], summary="Enforcement counts by county/year")
-def get_enforcement_summary(
-    county: Optional[str] = Query(default=None),
-    year: Optional[int] = Query(default=None, ge=1900, le=2100),
-    source: Optional[str] = Query(default=None),
-    limit: int = Query(default=1000, ge=1, le=10000),
-):
-    params = {"limit": limit}
-    wh = []
-    if county:
-        params["county"] = f"%{county}%"
-        wh.append("(x.county ILIKE :county)")
-    if year:
-        params["year"] = year
-        wh.append("x.year = :year")
-    if source:
-        params["source"] = source.lower()
-        wh.append("x.source = :source")
-    where_sql = f"WHERE {' AND '.join(wh)}" if wh else ""
 
-    q = f"""
+def _summary_query(air_table: str, water_table: str, air_year: str, water_year: str, where_sql: str) -> str:
+    return f"""
     WITH air AS (
         SELECT
+            a.county_id,
             c.county_name AS county,
-            NULLIF(substring(a.achieved_date FROM '^[0-9]{{4}}'), '')::int AS year,
-            'air'::text AS source
-        FROM air_enforcements_md a
+            {air_year} AS year,
+            'air'::text AS source,
+            ''::text AS category
+        FROM {air_table} a
         LEFT JOIN counties c ON c.county_id = a.county_id
     ),
     water AS (
         SELECT
+            w.county_id,
             c.county_name AS county,
-            NULLIF(substring(w.case_closed FROM '^[0-9]{{4}}'), '')::int AS year,
-            'water'::text AS source
-        FROM water_enforcements_md w
+            {water_year} AS year,
+            'water'::text AS source,
+            COALESCE(w.media, '')::text AS category
+        FROM {water_table} w
         LEFT JOIN counties c ON c.county_id = w.county_id
     ),
     unioned AS (
@@ -49,7 +59,7 @@ def get_enforcement_summary(
         SELECT * FROM water
     ),
     x AS (
-        SELECT county, year, source
+        SELECT county_id, county, year, source, category
         FROM unioned
         WHERE county IS NOT NULL AND year IS NOT NULL
     )
@@ -57,20 +67,91 @@ def get_enforcement_summary(
         x.county,
         x.year,
         COUNT(*)::int AS total_enforcements,
-        MIN(x.source) AS source
+        x.source
     FROM x
     {where_sql}
-    GROUP BY x.county, x.year
-    ORDER BY x.county, x.year
+    GROUP BY x.county, x.year, x.source
+    ORDER BY x.county, x.year, x.source
+    LIMIT :limit
+    """
+
+
+def _item(r) -> dict:
+    return {
+        "county": r.county,
+        "year": int(r.year),
+        "total_enforcements": int(r.total_enforcements),
+        "source": getattr(r, "source", None),
+    }
+
+
+@router.get(
+    "",
+    response_model=List[EnforcementSummary],
+    summary="Enforcement counts by county/year/source",
+    description="Pages are ordered by (county, year, source); pass the X-Next-Cursor header "
+    "of a page as `cursor` to get the next one. `format=ndjson|csv` streams every matching "
+    "row (up to `limit` if given) from a server-side cursor.",
+)
+async def get_enforcement_summary(
+    county: Optional[str] = Query(default=None),
+    year: Optional[int] = Query(default=None, ge=1900, le=2100),
+    source: Optional[str] = Query(default=None),
+    category: Optional[str] = Query(default=None, description="water media, e.g. Sediment"),
+    limit: Optional[int] = Query(default=None, ge=1, le=10000, description="page size, 1000 by default"),
+    cursor: Optional[str] = Query(default=None),
+    fmt: Literal["json", "ndjson", "csv"] = Query(default="json", alias="format"),
+):
+    page_size = limit or DEFAULT_LIMIT
+    # one extra row tells whether there is a next page
+    params = {"limit": limit if fmt != "json" else page_size + 1}
+    wh = []
+    if county:
+        params["county"] = county
+        wh.append(county_filter("x.county_id"))
+    if year:
+        params["year"] = year
+        wh.append("x.year = :year")
+    if source:
+        params["source"] = source.lower()
+        wh.append("x.source = :source")
+    if category:
+        params["category"] = category
+        wh.append("x.category = :category")
+    after = keyset_after(cursor, ["x.county", "x.year", "x.source"], params)
+    if after:
+        wh.append(after)
+    where_sql = f"WHERE {' AND '.join(wh)}" if wh else ""
+
+    # filters use the rollup's key
+    q_rollup = f"""
+    SELECT
+        x.county,
+        x.year,
+        SUM(x.total_enforcements)::int AS total_enforcements,
+        x.source
+    FROM (
+        SELECT r.*, c.county_name AS county
+        FROM enforcement_rollup r
+        JOIN counties c ON c.county_id = r.county_id
+    ) x
+    {where_sql}
+    GROUP BY x.county, x.year, x.source
+    ORDER BY x.county, x.year, x.source
     LIMIT :limit
     """
-    rows = try_queries([q], params)
-    return [
-        {
-            "county": r.county,
-            "year": int(r.year),
-            "total_enforcements": int(r.total_enforcements),
-            "source": getattr(r, "source", None),
-        }
-        for r in rows
-    ]
+
+    plan = await plan_for("enforcements", county_filter=bool(county))
+    if plan.name == "rollup":
+        q = q_rollup
+    elif plan.name == "warehouse":
+        q = _summary_query("air_enforcements_in_md", "water_enforcements_in_md", "a.year", "w.year", where_sql)
+    else:
+        q = _summary_query("air_enforcements_md", "water_enforcements_md",
+                           _text_year("a.achieved_date"), _text_year("w.case_closed"), where_sql)
+    if fmt != "json":
+        return stream_rows(await astream(q, params), _item, COLUMNS, fmt)
+
+    items = [_item(r) for r in await afetch_all(q, params)]
+    next_page = next_cursor(items, ["county", "year", "source"], page_size)
+    return json_response(items, List[EnforcementSummary], headers={"X-Next-Cursor": next_page} if next_page else None)
@@ -1,22 +1,50 @@
+import time
 from fastapi import APIRouter
-from ..db import get_engine
 from ..deps import get_settings
-from ..schemas import HealthResponse
+from ..probe import get_health_probe, pool_status
+from ..schemas import Freshness, HealthResponse, PoolStatus, ProbeStatus
 
 router = APIRouter()
 
 
-@router.get("/health", response_model=HealthResponse, summary="Health check for API and DB")
-def health():
-	engine = get_engine()
-	ok = False
-	try:
-		with engine.connect() as conn:
-			conn.exec_driver_sql("SELECT 1")
-		ok = True
-	except Exception:
-		ok = False
-	settings = get_settings()
-	return HealthResponse(status="ok" if ok else "degraded", db_connected=ok, version=settings.API_VERSION)
+def _since(checked_at):
+	return round(time.monotonic() - checked_at, 3) if checked_at is not None else None
 
 
+@router.get("/health", response_model=HealthResponse, summary="Health check for API and DB")
+async def health():
+	# answered from the background probe; no DB access, so polling cannot starve the pool
+	settings = get_settings()
+	probe = get_health_probe()
+	last, last_ok = probe.last, probe.last_ok
+	ok = probe.connected()
+	plans = last_ok.query_plans if last_ok else {}
+	freshness = None
+	if last_ok is not None:
+		# ages were read on the DB clock; add the time since that probe
+		elapsed = _since(last_ok.checked_at)
+		overview_age = last_ok.overview_age_seconds
+		load_age = last_ok.last_load_age_seconds
+		freshness = Freshness(
+			data_version=last_ok.data_version,
+			overview_age_seconds=round(overview_age + elapsed, 3) if overview_age is not None else None,
+			last_load_age_seconds=round(load_age + elapsed, 3) if load_age is not None else None,
+			stale=load_age is None or load_age + elapsed > settings.HEALTH_STALE_AFTER_SECONDS,
+		)
+	healthy = ok and all(plans.values())
+	return HealthResponse(
+		status="ok" if healthy else "degraded",
+		db_connected=ok,
+		version=settings.API_VERSION,
+		query_plans=plans,
+		missing_objects=last_ok.missing_objects if last_ok else {},
+		probe=ProbeStatus(
+			interval_seconds=probe.interval,
+			last_checked_seconds_ago=_since(last.checked_at if last else None),
+			last_success_seconds_ago=_since(last_ok.checked_at if last_ok else None),
+			latency_ms=last_ok.latency_ms if last_ok else None,
+			error=last.error if last else None,
+		),
+		pool={name: PoolStatus(**status) for name, status in pool_status().items()},
+		freshness=freshness,
+	)
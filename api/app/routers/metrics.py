@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from ..db import engines
+from ..metrics import CONTENT_TYPE, render
+
+router = APIRouter()
+
+
+@router.get("/metrics", summary="Prometheus metrics")
+def metrics():
+	return Response(render(engines()), media_type=CONTENT_TYPE)
@@ -1,36 +1,74 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Query
-from ..db import try_queries
+from ..catalog import COUNTY_LOOKUP, Plan, plan_for, register
+from ..db import afetch_all, astream, county_filter
+from ..pagination import keyset_after, next_cursor
 from ..schemas import Wage
+from ..serialization import json_response
+from ..streaming import stream_rows
 
 router = APIRouter()
 
+DEFAULT_LIMIT = 1000
+COLUMNS = ["county", "year", "wage_for_county"]
 
-@router.get("", response_model=List[Wage], summary="Average wage per county/year")
-def list_wages(
+# warehouse table first, then the legacy name
+WAGE_TABLES = {"warehouse": "average_wage_per_county", "legacy": "wages_per_county"}
+register("wages", [
+    Plan(plan, {**COUNTY_LOOKUP, table: ("county_id", "year", "wage_for_county")})
+    for plan, table in WAGE_TABLES.items()
+])
+
+
+def _item(r) -> dict:
+    return {"county": r.county, "year": int(r.year), "wage_for_county": float(r.wage_for_county)}
+
+
+@router.get(
+    "",
+    response_model=List[Wage],
+    summary="Average wage per county/year",
+    description="Pages are ordered by (county, year); pass the X-Next-Cursor header of a page "
+    "as `cursor` to get the next one. `format=ndjson|csv` streams every matching row "
+    "(up to `limit` if given) from a server-side cursor.",
+)
+async def list_wages(
     county: Optional[str] = Query(default=None),
     year: Optional[int] = Query(default=None, ge=1900, le=2100),
-    limit: int = Query(default=1000, ge=1, le=10000),
+    limit: Optional[int] = Query(default=None, ge=1, le=10000, description="page size, 1000 by default"),
+    cursor: Optional[str] = Query(default=None),
+    fmt: Literal["json", "ndjson", "csv"] = Query(default="json", alias="format"),
 ):
-    params = {"limit": limit}
+    page_size = limit or DEFAULT_LIMIT
+    # one extra row tells whether there is a next page
+    params = {"limit": limit if fmt != "json" else page_size + 1}
     where = []
     if county:
-        params["county"] = f"%{county}%"
-        where.append("c.county_name ILIKE :county")
+        params["county"] = county
+        where.append(county_filter("w.county_id"))
     if year:
         params["year"] = year
         where.append("w.year = :year")
+    after = keyset_after(cursor, ["c.county_name", "w.year"], params)
+    if after:
+        where.append(after)
     where_sql = f"WHERE {' AND '.join(where)}" if where else ""
     q = f"""
     SELECT
         c.county_name AS county,
         w.year::int AS year,
         w.wage_for_county::float AS wage_for_county
-    FROM wages_per_county w
+    FROM {{table}} w
     LEFT JOIN counties c ON c.county_id = w.county_id
     {where_sql}
     ORDER BY county, year
     LIMIT :limit
     """
-    rows = try_queries([q], params)
-    return [{"county": r.county, "year": int(r.year), "wage_for_county": float(r.wage_for_county)} for r in rows]
+    plan = await plan_for("wages", county_filter=bool(county))
+    q = q.format(table=WAGE_TABLES[plan.name])
+    if fmt != "json":
+        return stream_rows(await astream(q, params), _item, COLUMNS, fmt)
+
+    items = [_item(r) for r in await afetch_all(q, params)]
+    next_page = next_cursor(items, ["county", "year"], page_size)
+    return json_response(items, List[Wage], headers={"X-Next-Cursor": next_page} if next_page else None)
@@ -1,12 +1,41 @@
-from typing import Optional, List, Literal
+from typing import Dict, Optional, List, Literal
 from pydantic import BaseModel, Field
 from pydantic import ConfigDict
 
 
+class ProbeStatus(BaseModel):
+    interval_seconds: float
+    last_checked_seconds_ago: Optional[float] = None
+    last_success_seconds_ago: Optional[float] = None
+    # round trip of the last successful probe query, pool checkout included
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_out: int
+    overflow: int
+    capacity: int
+    saturation: float
+
+
+class Freshness(BaseModel):
+    data_version: Optional[int] = None
+    overview_age_seconds: Optional[float] = None
+    last_load_age_seconds: Optional[float] = None
+    stale: bool = False
+
+
 class HealthResponse(BaseModel):
     status: str = "ok"
     db_connected: bool
     version: str
+    query_plans: Dict[str, Optional[str]] = {}
+    missing_objects: Dict[str, List[str]] = {}
+    probe: Optional[ProbeStatus] = None
+    pool: Dict[str, PoolStatus] = {}
+    freshness: Optional[Freshness] = None
 
 
 class County(BaseModel):
@@ -40,3 +69,4 @@ class OverviewItem(BaseModel):
 class OverviewResponse(BaseModel):
     items: List[OverviewItem]
     count: int
+    next_cursor: Optional[str] = Field(default=None, description="pass as cursor for the next page")
@@ -0,0 +1,40 @@
+"""Fast JSON responses: rows are encoded directly (with orjson when installed) and
+checked against their response schema only in debug mode."""
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+from .deps import get_settings
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+
+def dumps(content: Any) -> bytes:
+	if orjson is not None:
+		return orjson.dumps(content)
+	return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+	return TypeAdapter(schema)
+
+
+class FastJSONResponse(Response):
+	media_type = "application/json"
+
+	def render(self, content: Any) -> bytes:
+		return dumps(content)
+
+
+def json_response(content: Any, schema: Any = None, headers: Optional[Dict[str, str]] = None) -> Response:
+	"""Serialize plain dicts/lists built from DB rows without a pydantic model per row.
+	With DEBUG=true (as in tests) the content is validated against schema first, so
+	drift from the documented response_model fails loudly instead of shipping."""
+	if schema is not None and get_settings().DEBUG:
+		_adapter(schema).validate_python(content)
+	return FastJSONResponse(content, headers=headers)
@@ -0,0 +1,32 @@
+"""NDJSON and CSV responses written batch by batch from a server-side cursor."""
+import csv
+import io
+from typing import Any, AsyncIterator, Callable, Dict, Sequence
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Row
+from .serialization import dumps
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _ndjson(batches: AsyncIterator[Sequence[Row]], to_item: Callable[[Row], Dict[str, Any]]) -> AsyncIterator[bytes]:
+	async for batch in batches:
+		yield b"".join(dumps(to_item(r)) + b"\n" for r in batch)
+
+
+async def _csv(batches: AsyncIterator[Sequence[Row]], to_item: Callable[[Row], Dict[str, Any]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+	buf = io.StringIO()
+	writer = csv.DictWriter(buf, fieldnames=list(columns), extrasaction="ignore")
+	writer.writeheader()
+	async for batch in batches:
+		writer.writerows(to_item(r) for r in batch)
+		yield buf.getvalue().encode("utf-8")
+		buf.seek(0)
+		buf.truncate()
+	if buf.tell():
+		yield buf.getvalue().encode("utf-8")
+
+
+def stream_rows(batches: AsyncIterator[Sequence[Row]], to_item: Callable[[Row], Dict[str, Any]], columns: Sequence[str], fmt: str) -> StreamingResponse:
+	body = _csv(batches, to_item, columns) if fmt == "csv" else _ndjson(batches, to_item)
+	return StreamingResponse(body, media_type=MEDIA_TYPES[fmt])
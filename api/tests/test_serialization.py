@@ -0,0 +1,58 @@
+"""Response validation in debug mode. Run from api/ with: python -m pytest tests"""
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.deps import get_settings
+from app.schemas import Wage
+from app.serialization import json_response
+
+
+@pytest.fixture
+def debug(monkeypatch):
+	monkeypatch.setenv("DEBUG", "true")
+	monkeypatch.setenv("CACHE_ENABLED", "false")
+	get_settings.cache_clear()
+	yield
+	get_settings.cache_clear()
+
+
+def test_debug_rejects_payload_not_matching_schema(debug):
+	with pytest.raises(ValidationError):
+		json_response([{"county": None, "year": "not a year", "wage_for_county": 1.0}], List[Wage])
+
+
+def test_debug_accepts_matching_payload(debug):
+	response = json_response([{"county": "Allegany", "year": 2020, "wage_for_county": 45000.0}], List[Wage])
+	assert response.body == b'[{"county":"Allegany","year":2020,"wage_for_county":45000.0}]'
+
+
+def test_without_debug_payload_is_not_validated(monkeypatch):
+	monkeypatch.setenv("DEBUG", "false")
+	get_settings.cache_clear()
+	try:
+		response = json_response([{"county": None}], List[Wage])
+	finally:
+		get_settings.cache_clear()
+	assert response.body == b'[{"county":null}]'
+
+
+def test_debug_route_with_bad_rows_fails(debug, monkeypatch):
+	from app.catalog import Plan
+	from app.main import app
+	from app.routers import wages
+
+	async def plan_for(route, county_filter=False):
+		return Plan("warehouse", {})
+
+	async def afetch_all(sql, params=None):
+		# a wage row without a county, which the Wage schema does not allow
+		return [SimpleNamespace(county=None, year=2020, wage_for_county=45000)]
+
+	monkeypatch.setattr(wages, "plan_for", plan_for)
+	monkeypatch.setattr(wages, "afetch_all", afetch_all)
+	with pytest.raises(ValidationError):
+		TestClient(app).get("/wages")
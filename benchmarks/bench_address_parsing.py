@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script benchmarks the single-pass city_state_zip parser
+in mdprocessingutils against the previous multi-pass cleaning
+steps on synthetic enforcement rows, reporting rows/sec.
+
+Run from the repository root:
+    python3 benchmarks/bench_address_parsing.py --rows 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mdprocessingutils import *
+
+CITIES = ["Baltimore", "Columbia", "Germantown", "Silver Spring",
+          "Waldorf", "Frederick", "Rockville", "Gaithersburg",
+          "Bowie", "Hagerstown", "Annapolis", "Salisbury",
+          "Cumberland", "Brandywine", "Dowell", "Ellerslie"]
+
+def make_rows(n_rows, seed=0):
+    """
+    Builds a synthetic frame with the raw enforcement columns
+    used by the address and key cleaning steps.
+    """
+    rng = np.random.default_rng(seed)
+    cities = rng.choice(CITIES, n_rows)
+    zips = rng.integers(20601, 21930, n_rows).astype(str)
+    plus4 = np.where(rng.random(n_rows) < 0.3,
+                     "-" + rng.integers(1000, 9999, n_rows).astype(str),
+                     "")
+    city_state_zip = (pd.Series(cities, dtype=object)
+                      + ",MD,"
+                      + pd.Series(zips, dtype=object)
+                      + pd.Series(plus4, dtype=object))
+    return pd.DataFrame({
+        "ai": pd.Series(rng.integers(1, 200000, n_rows).astype(str),
+                        dtype=object),
+        "facility_name": pd.Series(cities, dtype=object) + " Facility",
+        "city_state_zip": city_state_zip,
+    })
+
+def multi_pass(df):
+    """The cleaning steps as fetchdata.py ran them previously."""
+    df = string_split_column(df,'city_state_zip',',')
+    df = rename_split_columns(df,'city_state_zip')
+    df = combine_2_cols(df,'ai','facility_name','ai_combined',' - ')
+    df['zip'] = df['zip'].str.strip()
+    df['zip'] = df['zip'].str.split('-').str[0]
+    df['zip'] = (pd.to_numeric(df['zip'],
+                               errors='coerce')
+                 .fillna(0)
+                 .astype(int)
+                 )
+    return df
+
+def single_pass(df):
+    """The vectorized parser and key builder."""
+    df = parse_city_state_zip(df,'city_state_zip')
+    df = combine_key_cols(df,'ai','facility_name','ai_combined',' - ')
+    return df
+
+def bench(func, df, repeat):
+    """Returns the best wall time and the output of func."""
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        out = func(frame)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_rows(args.rows)
+    for name, func in [("multi_pass", multi_pass),
+                       ("single_pass", single_pass)]:
+        seconds, out = bench(func, df, args.repeat)
+        memory_mb = out.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:>12}: {args.rows / seconds:>12,.0f} rows/sec "
+              f"({seconds:.2f}s, output {memory_mb:,.0f} MB)")
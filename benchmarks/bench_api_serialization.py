@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script measures the per-row cost of turning overview rows
+into a JSON response body at 1k, 10k and 100k rows:
+
+    models:    an OverviewItem per row, then response_model
+               validation and encoding as FastAPI does it
+    validated: plain dicts validated against the response
+               schema and encoded (the DEBUG=true path)
+    fast:      plain dicts encoded directly (the default path)
+
+Run from the repository root:
+    python3 benchmarks/bench_api_serialization.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+from app.schemas import OverviewItem, OverviewResponse
+from app.serialization import dumps, orjson
+
+COUNTIES = ["Allegany", "Anne Arundel", "Baltimore City", "Baltimore County",
+            "Calvert", "Caroline", "Carroll", "Cecil", "Charles", "Frederick",
+            "Howard", "Montgomery", "Prince George's", "St. Mary's"]
+
+RESPONSE = TypeAdapter(OverviewResponse)
+
+def make_items(n_rows, seed=0):
+    """Builds overview items as the routers build them from rows."""
+    rng = np.random.default_rng(seed)
+    counties = rng.choice(COUNTIES, n_rows)
+    years = rng.integers(2000, 2025, n_rows)
+    totals = rng.integers(0, 50, n_rows)
+    wages = rng.integers(30000, 80000, n_rows)
+    has_wage = rng.random(n_rows) < 0.8
+    return [{"county": str(c), "year": int(y), "total_enforcements": int(t),
+             "average_wage": float(w) if h else None}
+            for c, y, t, w, h in zip(counties, years, totals, wages, has_wage)]
+
+def models(items):
+    """The previous overview path."""
+    body = OverviewResponse(items=[OverviewItem(**i) for i in items], count=len(items))
+    validated = RESPONSE.validate_python(body, from_attributes=True)
+    return json.dumps(RESPONSE.dump_python(validated, mode="json", by_alias=True)).encode("utf-8")
+
+def validated(items):
+    body = {"items": items, "count": len(items), "next_cursor": None}
+    RESPONSE.validate_python(body)
+    return dumps(body)
+
+def fast(items):
+    return dumps({"items": items, "count": len(items), "next_cursor": None})
+
+def bench(func, items, repeat):
+    """Returns the best wall time of func over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    for n_rows in args.rows:
+        items = make_items(n_rows)
+        for name, func in [("models", models), ("validated", validated), ("fast", fast)]:
+            seconds = bench(func, items, args.repeat)
+            print(f"{n_rows:>8,} rows {name:>10}: {seconds * 1000:>9.2f} ms "
+                  f"({seconds / n_rows * 1e6:>6.2f} us/row)")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script benchmarks the pipeline on synthetic data from
+benchmarks/mdsynthetic.py at several sizes (records per
+enforcement dataset, 1k to 10M):
+
+    transforms: fetchdata.py cleaning of each raw file, with the
+                time spent in each mdprocessingutils function
+    load:       final_project.py into a scratch Postgres database,
+                a first load and an unchanged reload, per table
+    api:        each API route under concurrent clients, with the
+                response cache off (requires httpx and uvicorn)
+
+Each suite needs the output of the previous one, which is built
+without being timed when that suite is not selected. Results are
+written as JSON to benchmarks/results/<commit>_<time>.json, and
+--compare prints the change against an earlier results file.
+
+The scratch database (dropped and recreated for every size) is
+reached with the same PGHOST/PGPORT/PGUSER/PGPASSWORD settings as
+final_project.py. Run from the repository root:
+    python3 benchmarks/bench_pipeline.py --rows 1000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import psycopg2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+import mdsynthetic
+from fetchdata import clean_file, estimate_batch_size
+from final_project import DB_PARAMS, SCHEMA_SQL
+from mdprofiling import peak_rss_mb, start_run, stop_run
+
+SUITES = ["transforms", "load", "api"]
+
+# One path per route, with filters as a dashboard would send them
+ROUTES = {"health": "/health",
+          "counties": "/counties",
+          "enforcements": "/enforcements?year=2015",
+          "enforcements_page": "/enforcements?limit=100",
+          "wages": "/wages?county=howard",
+          "overview": "/report/overview?county=baltimore",
+          "overview_ndjson": "/report/overview?format=ndjson",
+          }
+
+def result(suite, n_rows, name, seconds, rows=None, **extra):
+    """One result row; rows_per_sec when a row count applies."""
+    out = {"suite": suite, "rows": n_rows, "name": name,
+           "seconds": round(seconds, 6)}
+    if rows is not None:
+        out["rows_per_sec"] = round(rows / seconds, 1) if seconds > 0 else None
+    out.update(extra)
+    return out
+
+def generate(work_dir, n_rows, seed):
+    """Writes the synthetic raw files unless they already exist."""
+    raw_dir = os.path.join(work_dir, "raw_data")
+    if not os.path.exists(os.path.join(raw_dir, f"{mdsynthetic.WAGE}.csv")):
+        start = time.perf_counter()
+        mdsynthetic.write_dataset(work_dir, n_rows, seed)
+        print(f"{n_rows:>10,} rows generated in {time.perf_counter() - start:.1f}s")
+    return raw_dir
+
+def bench_transforms(work_dir, n_rows):
+    """Cleans each raw file as fetchdata.py does, in batches."""
+    results = []
+    clean_dir = os.path.join(work_dir, "clean_data")
+    os.makedirs(clean_dir, exist_ok=True)
+    for name in (mdsynthetic.AIR, mdsynthetic.WATER, mdsynthetic.WAGE):
+        ext = ".csv" if name == mdsynthetic.WAGE else ".ndjson"
+        path = os.path.join(work_dir, "raw_data", f"{name}{ext}")
+        start_run(f"transform_{name}")
+        start = time.perf_counter()
+        rows = clean_file(path,
+                          os.path.join(clean_dir, f"{name}_cleaned.csv"),
+                          name,
+                          estimate_batch_size(path))
+        seconds = time.perf_counter() - start
+        profile = stop_run().report()
+        results.append(result("transforms", n_rows, name, seconds, rows,
+                              peak_rss_mb=peak_rss_mb()))
+        for function, totals in sorted(profile["functions"].items()):
+            results.append(result("transforms", n_rows,
+                                  f"{name}:{function}",
+                                  totals["seconds"],
+                                  totals["rows_in"],
+                                  calls=totals["calls"]))
+    return results
+
+def reset_database(database):
+    """Drops and recreates the scratch database from the schema."""
+    admin = psycopg2.connect(**dict(DB_PARAMS, database="postgres"))
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{database}"')
+        cur.execute(f'CREATE DATABASE "{database}"')
+    admin.close()
+    conn = psycopg2.connect(**dict(DB_PARAMS, database=database))
+    with conn.cursor() as cur, open(SCHEMA_SQL) as f:
+        cur.execute(f.read())
+    conn.commit()
+    conn.close()
+
+def bench_load(work_dir, n_rows, database):
+    """
+    Runs final_project.py twice against a fresh database: a first
+    load of every row, then a reload where no row has changed.
+    """
+    results = []
+    reset_database(database)
+    for run in ("initial", "unchanged"):
+        report_path = os.path.join(work_dir, f"load_{run}.json")
+        env = dict(os.environ, PGDATABASE=database, MD_PROFILE_REPORT=report_path)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, "final_project.py")],
+                       cwd=work_dir, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        seconds = time.perf_counter() - start
+        with open(report_path) as f:
+            report = json.load(f)
+        loads = [s for s in report["stages"] if s["stage"].startswith("load:")]
+        results.append(result("load", n_rows, run, seconds,
+                              sum(s["rows_in"] for s in loads),
+                              peak_rss_mb=report["peak_rss_mb"]))
+        for s in report["stages"]:
+            if s["stage"].startswith(("read:", "load:", "refresh:")):
+                results.append(result("load", n_rows, f"{run}:{s['stage']}",
+                                      s["seconds"],
+                                      s["rows_in"] if s["rows_in"] is not None
+                                      else s["rows_out"]))
+    return results
+
+def database_url(database):
+    """SQLAlchemy URL of the scratch database for the API."""
+    p = DB_PARAMS
+    if p["host"].startswith("/"):
+        return (f"postgresql+psycopg://{p['user']}:{p['password']}@/{database}"
+                f"?host={p['host']}&port={p['port']}")
+    return (f"postgresql+psycopg://{p['user']}:{p['password']}"
+            f"@{p['host']}:{p['port']}/{database}")
+
+def bench_api(n_rows, database, clients, n_requests, port):
+    """Load tests each route on its own against the loaded database."""
+    from bench_api_concurrency import percentile, run_load, start_server
+
+    results = []
+    os.environ["DATABASE_URL"] = database_url(database)
+    server = start_server(port, True, 5, 10)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for name, path in ROUTES.items():
+            # warm up connections and plans
+            asyncio.run(run_load(base_url, min(clients, 20), 100, [path]))
+            seconds, latencies, errors = asyncio.run(
+                run_load(base_url, clients, n_requests, [path]))
+            results.append(result("api", n_rows, name, seconds,
+                                  requests_per_sec=round(len(latencies) / seconds, 1),
+                                  p50_ms=round(percentile(latencies, 50) * 1000, 2),
+                                  p95_ms=round(percentile(latencies, 95) * 1000, 2),
+                                  p99_ms=round(percentile(latencies, 99) * 1000, 2),
+                                  errors=errors,
+                                  clients=clients))
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+def git_commit():
+    """Returns (commit hash, whether the tree has local changes)."""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True,
+                              text=True).stdout.strip()
+    return git("rev-parse", "HEAD") or "unknown", bool(git("status", "--porcelain"))
+
+def print_result(r):
+    rate = (f"{r['rows_per_sec']:>14,.0f} rows/sec" if r.get("rows_per_sec")
+            else f"{r['requests_per_sec']:>10,.0f} req/sec p95 {r['p95_ms']:>7.1f} ms"
+            if "requests_per_sec" in r else "")
+    print(f"{r['suite']:>10} {r['rows']:>10,} {r['name']:<60} "
+          f"{r['seconds']:>9.3f}s {rate}")
+
+def compare(results, old_path):
+    """Prints the change in seconds for results present in both runs."""
+    with open(old_path) as f:
+        old = json.load(f)
+    before = {(r["suite"], r["rows"], r["name"]): r for r in old["results"]}
+    print(f"\ncompared with {old['commit'][:10]} ({old['started_at']}):")
+    for r in results:
+        o = before.get((r["suite"], r["rows"], r["name"]))
+        if o and o["seconds"] > 0:
+            print(f"{r['suite']:>10} {r['rows']:>10,} {r['name']:<60} "
+                  f"{o['seconds']:>9.3f}s -> {r['seconds']:>9.3f}s "
+                  f"({r['seconds'] / o['seconds'] - 1:>+7.1%})")
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "md_bench"),
+                        help="where synthetic data is generated and kept for reuse")
+    parser.add_argument("--database", default="final_project_bench",
+                        help="scratch database, dropped and recreated per size")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="requests per route")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--output", default=None,
+                        help="results file (defaults to benchmarks/results/<commit>_<time>.json)")
+    parser.add_argument("--compare", default=None,
+                        help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    commit, dirty = git_commit()
+    last = max(SUITES.index(s) for s in args.suites)
+    results = []
+    for n_rows in args.rows:
+        work_dir = os.path.join(args.work_dir, f"{n_rows}_seed{args.seed}")
+        generate(work_dir, n_rows, args.seed)
+        steps = [lambda: bench_transforms(work_dir, n_rows),
+                 lambda: bench_load(work_dir, n_rows, args.database),
+                 lambda: bench_api(n_rows, args.database, args.clients,
+                                   args.requests, args.port)]
+        for suite, step in zip(SUITES[:last + 1], steps):
+            step_results = step()
+            if suite in args.suites:
+                for r in step_results:
+                    print_result(r)
+                results.extend(step_results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{commit[:10]}_{started_at:%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit,
+                   "dirty": dirty,
+                   "started_at": started_at.isoformat(),
+                   "host": platform.node(),
+                   "python": platform.python_version(),
+                   "cpus": os.cpu_count(),
+                   "args": vars(args),
+                   "results": results,
+                   }, f, indent=4)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
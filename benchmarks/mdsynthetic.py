@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module generates synthetic Maryland datasets of any size
+in the raw formats fetchdata.py writes: air and water
+enforcement records as NDJSON and the wage table as CSV.
+
+Distributions are resampled from the sample files in raw_data/:
+counties and their city_state_zip values are drawn together so
+geography stays consistent, with some ZIP+4 suffixes and missing
+states added, dates keep the per-year frequencies and null rates
+of the samples (water cases close a sampled number of days after
+they are issued), and categorical fields keep their frequencies.
+Record ids are unique, so every row is a distinct facility.
+
+Run from the repository root to write raw_data/ for 1M rows:
+    python3 benchmarks/mdsynthetic.py --rows 1000000 --out /tmp/md_bench
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(REPO_DIR, "raw_data")
+
+AIR = "md_air_enforcement"
+WATER = "md_water_enforcement"
+WAGE = "Maryland_Average_Wage_Per_Job_(Current_Dollars)__2014-2024"
+
+# Rows generated and written per NDJSON chunk, bounding memory
+CHUNK_ROWS = 250_000
+
+# Share of addresses with a ZIP+4 suffix or without a state
+PLUS4_RATE = 0.3
+MISSING_STATE_RATE = 0.02
+
+STREETS = ["Main St", "Church Rd", "Industrial Pkwy", "Harbor Dr",
+           "Old Mill Rd", "Route 40", "Bay Ave", "Ridge Rd",
+           "Market St", "Airport Rd", "Creek Ln", "Farm Rd"]
+
+def load_samples(sample_dir=SAMPLE_DIR):
+    """Reads the sample enforcement and wage files."""
+    def ndjson(name):
+        return pd.read_json(os.path.join(sample_dir, f"{name}.ndjson"),
+                            lines=True,
+                            dtype=False,
+                            convert_dates=False)
+    wage = pd.read_csv(os.path.join(sample_dir, f"{WAGE}.csv"), dtype=str)
+    return {AIR: ndjson(AIR), WATER: ndjson(WATER), WAGE: wage}
+
+def sample_column(rng, series, n_rows):
+    """
+    Draws n_rows values with the frequencies (including the null
+    rate) of a sample column.
+    """
+    values = series.astype(object).where(series.notna(), None).to_numpy()
+    return values[rng.integers(0, len(values), n_rows)]
+
+def sample_addresses(rng, samples, n_rows):
+    """
+    Draws (county, city_state_zip) pairs from both enforcement
+    samples, then varies the zip suffix and drops some states.
+    """
+    pairs = pd.concat([samples[AIR][["county", "city_state_zip"]],
+                       samples[WATER][["county", "city_state_zip"]]],
+                      ignore_index=True)
+    idx = rng.integers(0, len(pairs), n_rows)
+    county = pairs["county"].to_numpy(dtype=object)[idx]
+    parts = (pairs["city_state_zip"]
+             .str.extract(r"^(?P<city>[^,]*),(?P<state>[^,]*),(?P<zip>\d{5})")
+             .iloc[idx]
+             .reset_index(drop=True))
+    plus4 = np.where(rng.random(n_rows) < PLUS4_RATE,
+                     "-" + rng.integers(1000, 9999, n_rows).astype(str),
+                     "")
+    state = np.where(rng.random(n_rows) < MISSING_STATE_RATE,
+                     "",
+                     parts["state"].fillna("MD").to_numpy(dtype=object))
+    city_state_zip = (parts["city"].fillna("").to_numpy(dtype=object)
+                      + "," + state + ","
+                      + parts["zip"].fillna("").to_numpy(dtype=object)
+                      + plus4)
+    return county, city_state_zip
+
+def sample_dates(rng, series, n_rows):
+    """
+    Draws timestamps in the Socrata format with the per-year
+    frequencies and null rate of a sample column.
+    """
+    parsed = pd.to_datetime(series, errors="coerce")
+    years = sample_column(rng, parsed.dt.year, n_rows).astype(float)  # None -> nan
+    missing = np.isnan(years)
+    start = pd.to_datetime(np.where(missing, 2000, years).astype(int)
+                           .astype(str), format="%Y")
+    dates = start + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")
+    out = dates.strftime("%Y-%m-%dT00:00:00.000").to_numpy(dtype=object)
+    out[missing] = None
+    return out
+
+def street_addresses(rng, n_rows):
+    numbers = rng.integers(1, 25000, n_rows).astype(str)
+    streets = np.asarray(STREETS, dtype=object)[rng.integers(0, len(STREETS), n_rows)]
+    return numbers.astype(object) + " " + streets
+
+def make_air(n_rows, samples, seed=0, start_id=0):
+    """Builds raw air enforcement records."""
+    rng = np.random.default_rng(seed)
+    sample = samples[AIR]
+    county, city_state_zip = sample_addresses(rng, samples, n_rows)
+    ids = np.arange(start_id, start_id + n_rows) + 100000
+    has_document = rng.random(n_rows) < sample["documents"].notna().mean()
+    documents = np.full(n_rows, None, dtype=object)
+    documents[has_document] = [
+        {"url": f"https://mdedataviewer.mde.state.md.us/OpenDataDocuments?ID={i}"}
+        for i in ids[has_document]]
+    return pd.DataFrame({
+        "documents": documents,
+        "ai": ids.astype(str),
+        "facility_name": "Facility " + ids.astype(str).astype(object),
+        "county": county,
+        "action_description": sample_column(rng, sample["action_description"], n_rows),
+        "achieved_date": sample_dates(rng, sample["achieved_date"], n_rows),
+        "addressinfo": street_addresses(rng, n_rows),
+        "city_state_zip": city_state_zip,
+    })
+
+def make_water(n_rows, samples, seed=0, start_id=0):
+    """Builds raw water enforcement records."""
+    rng = np.random.default_rng(seed + 1)
+    sample = samples[WATER]
+    county, city_state_zip = sample_addresses(rng, samples, n_rows)
+    ids = np.arange(start_id, start_id + n_rows) + 100000
+    issued = sample_dates(rng, sample["enforcement_action_issued"], n_rows)
+    # cases close a sampled number of days after they were issued
+    sample_closed = pd.to_datetime(sample["case_closed"], errors="coerce")
+    lag = (sample_closed
+           - pd.to_datetime(sample["enforcement_action_issued"], errors="coerce")).dt.days
+    lag = sample_column(rng, lag[lag >= 0], n_rows).astype(float)
+    closed = (pd.to_datetime(pd.Series(issued), format="%Y-%m-%dT%H:%M:%S.%f")
+              + pd.to_timedelta(lag, unit="D")).clip(upper=sample_closed.max())
+    # without an issue date, the close date is drawn on its own
+    fallback = pd.to_datetime(pd.Series(sample_dates(rng, sample["case_closed"], n_rows)),
+                              format="%Y-%m-%dT%H:%M:%S.%f")
+    closed = closed.fillna(fallback)
+    case_closed = closed.dt.strftime("%Y-%m-%dT00:00:00.000").to_numpy(dtype=object)
+    case_closed[closed.isna().to_numpy()] = None
+    return pd.DataFrame({
+        "ai_id": ids.astype(str),
+        "ai_name": "Site " + ids.astype(str).astype(object),
+        "addressinfo": street_addresses(rng, n_rows),
+        "city_state_zip": city_state_zip,
+        "county": county,
+        "enforcement_action": sample_column(rng, sample["enforcement_action"], n_rows),
+        "enforcement_action_no": "PS-" + ids.astype(str).astype(object),
+        "enforcement_action_issued": issued,
+        "case_closed": case_closed,
+        "media": sample_column(rng, sample["media"], n_rows),
+        "program": sample_column(rng, sample["program"], n_rows),
+        "upload_id": sample_column(rng, sample["upload_id"], n_rows),
+    })
+
+def make_wage(samples, first_year=1990, last_year=2024, seed=0):
+    """
+    Builds the wide wage table for a range of years, scaling the
+    latest sample year per county back with 3% yearly growth and
+    a little noise. The table is keyed by year, so it does not
+    grow with the enforcement row count.
+    """
+    rng = np.random.default_rng(seed + 2)
+    sample = samples[WAGE]
+    latest = sample.iloc[-1]
+    latest_year = int(latest["Year"])
+    counties = [c for c in sample.columns if c not in ("Date created", "Year")]
+    rows = []
+    for year in range(first_year, last_year + 1):
+        row = {"Date created": latest["Date created"], "Year": str(year)}
+        for county in counties:
+            base = int(str(latest[county]).replace(",", ""))
+            wage = base * 1.03 ** (year - latest_year) * rng.normal(1, 0.01)
+            row[county] = f"{int(wage):,}"
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["Date created", "Year"] + counties)
+
+def write_ndjson(df, path, append=False):
+    """Writes or appends records to an NDJSON file."""
+    with open(path, "a" if append else "w") as f:
+        df.to_json(f, orient="records", lines=True)
+
+def write_dataset(out_dir, n_rows, seed=0, samples=None, chunk_rows=CHUNK_ROWS):
+    """
+    Writes out_dir/raw_data with n_rows records for each
+    enforcement dataset and the wage table. Returns the paths.
+    """
+    samples = samples if samples is not None else load_samples()
+    raw_dir = os.path.join(out_dir, "raw_data")
+    os.makedirs(raw_dir, exist_ok=True)
+    paths = {}
+    for name, make in [(AIR, make_air), (WATER, make_water)]:
+        path = os.path.join(raw_dir, f"{name}.ndjson")
+        for i, start in enumerate(range(0, n_rows, chunk_rows)):
+            chunk = make(min(chunk_rows, n_rows - start), samples,
+                         seed=seed + i, start_id=start)
+            write_ndjson(chunk, path, append=i > 0)
+        paths[name] = path
+    paths[WAGE] = os.path.join(raw_dir, f"{WAGE}.csv")
+    make_wage(samples, seed=seed).to_csv(paths[WAGE], index=False, quoting=1)
+    return paths
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="records per enforcement dataset")
+    parser.add_argument("--out", required=True,
+                        help="directory to write raw_data/ into")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, path in write_dataset(args.out, args.rows, args.seed).items():
+        print(f"{name}: {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
@@ -1,23 +1,55 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-This script creates a dag that runs 
-fetchdata.py to extract Maryland environmental 
-enforcement data.
+This script creates a dag that extracts, cleans and loads
+Maryland data with one mapped task per dataset, so each
+dataset runs in parallel and retries on its own. Extraction
+is incremental, cleaning skips unchanged raw files, and the
+load only writes changed rows.
+
+Once every load has finished, publish refreshes the summary
+tables for the (county, year) keys that changed and bumps the
+data version. It only updates the MD_DATA dataset, which
+triggers pipeline_api_and_refresh, when a load changed data.
+Each task returns its summary and run report to XCom.
 """
 
 import os
-from airflow import DAG
-from airflow.providers.standard.operators.python import PythonOperator
+import sys
 from datetime import datetime, timedelta
+from airflow.exceptions import AirflowException, AirflowSkipException
+from md_datasets import MD_DATA
+
+try:
+    from airflow.sdk import dag, task, task_group
+except ImportError:  # Airflow 2
+    from airflow.decorators import dag, task, task_group
+
+# The repository root, where fetchdata.py and final_project.py
+# keep raw_data/, clean_data/ and state/
+REPO_DIR = os.environ.get("MD_REPO_DIR",
+                          os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def in_repo():
+    """
+    Makes the repository root the working directory and
+    importable. Called before importing the pipeline modules,
+    which resolve their data directories from the working
+    directory at import.
+    """
+    os.chdir(REPO_DIR)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
 
-# Define the path to fetchdata.py
-PARENT_DIR_PATH = os.path.dirname(os.getcwd())
-FETCH_DATA_PATH = (os
-                   .path
-                   .join(PARENT_DIR_PATH,
-                         "fetchdata.py")
-                         )
+def profiled_call(run_name, func, *args):
+    """Calls func as one profiled run; returns (result, run report)."""
+    from mdprofiling import start_run, stop_run
+    start_run(run_name)
+    try:
+        result = func(*args)
+    finally:
+        profile = stop_run()
+    return result, profile.report()
 
 # default arguments for the DAG
 DAG_DEFAULT_ARGS = {
@@ -25,13 +57,13 @@ DAG_DEFAULT_ARGS = {
 	"depends_on_past": False,
 	"email_on_failure": False,
 	"email_on_retry": False,
-	"retries": 1,
+	"retries": 2,
 	"retry_delay": timedelta(minutes=2),
 }
 
 # arguments that define the DAG
-DESCRIPTION = ("Extract Maryland environmental " + 
-               "enforcement data via fetchdata.py")
+DESCRIPTION = ("Extract, clean and load Maryland environmental " +
+               "enforcement and wage data per dataset")
 DAG_DEFINE_ARGS = {
     "dag_id": "md_data_extraction",
     "description": DESCRIPTION,
@@ -39,15 +71,111 @@ DAG_DEFINE_ARGS = {
     "start_date": datetime(2024, 1, 1),
     "schedule": "0 6 * * *",
     "catchup": False,
+    "max_active_runs": 1,
 }
 
-with DAG(**DAG_DEFINE_ARGS) as dag:
+@task
+def list_datasets():
+    """The API datasets of fetchdata.py and the wage CSV."""
+    in_repo()
+    from final_project import DATASETS
+    return DATASETS
+
+@task
+def load_counties():
+    """Loads the county tables every dataset references."""
+    in_repo()
+    from final_project import county_jobs, load_jobs
+    stats, report = profiled_call("load_counties",
+                                  lambda: load_jobs(county_jobs()))
+    return {"stats": stats, "profile": report}
+
+@task
+def extract(data_name):
+    """
+    Fetches one dataset into raw_data/; the wage CSV is kept in
+    the repository. Fails, and so retries, when the endpoint
+    cannot be reached.
+    """
+    in_repo()
+    from fetchdata import MD_API_DICT, extract_dataset
+    if data_name not in MD_API_DICT:
+        return {"data_name": data_name, "rows": 0, "skipped": "static file"}
+    summary, report = profiled_call(f"extract_{data_name}",
+                                    extract_dataset, data_name)
+    if "error" in summary:
+        raise AirflowException(f"Extracting {data_name} failed: {summary['error']}")
+    return dict(summary, profile=report)
+
+@task
+def transform(extracted):
+    """Cleans one dataset unless its raw file is unchanged."""
+    in_repo()
+    from fetchdata import transform_dataset
+    return transform_dataset(extracted["data_name"])
+
+@task
+def load(transformed, counties):
+    """
+    Loads one dataset's tables. counties only orders the load
+    after the county tables it references. The cleaned file is
+    loaded even when unchanged, so a load that failed on an
+    earlier run is caught up; unchanged rows are not written.
+    """
+    in_repo()
+    from final_project import dataset_jobs, load_jobs
+    data_name = transformed["data_name"]
+    stats, report = profiled_call(f"load_{data_name}",
+                                  lambda: load_jobs(dataset_jobs(data_name)))
+    return {"data_name": data_name, "stats": stats, "profile": report}
+
+@task_group
+def dataset_pipeline(data_name, counties):
+    return load(transform(extract(data_name)), counties)
+
+@task(outlets=[MD_DATA], trigger_rule="all_done")
+def publish(counties, loaded):
+    """
+    Refreshes the summaries for the keys every successful load
+    touched and bumps the data version, in one transaction. Runs
+    even when some datasets failed, as their siblings' rows are
+    already committed. Skipped, so MD_DATA is not updated, when
+    no load changed data.
+    """
+    in_repo()
+    from final_project import get_connection, publish_changes
+    stats = [s for result in [counties, *loaded] if result
+             for s in result["stats"]]
+    conn = get_connection()
+    try:
+        version = publish_changes(conn, stats)
+    finally:
+        conn.close()
+    if version is None:
+        raise AirflowSkipException("No load changed data.")
+    return {"data_version": version,
+            "tables": {s["table"]: {"inserted": s["inserted"],
+                                    "updated": s["updated"],
+                                    "deleted": s["deleted"]}
+                       for s in stats
+                       if s["inserted"] or s["updated"] or s["deleted"]},
+            }
+
+@task(trigger_rule="one_failed", retries=0)
+def fail_run():
+    """Fails the run when any dataset failed, as publish still succeeds."""
+    raise AirflowException("A dataset failed to extract, clean or load.")
+
+@dag(**DAG_DEFINE_ARGS)
+def md_data_extraction():
+
+    counties = load_counties()
+    loaded = (dataset_pipeline
+              .partial(counties=counties)
+              .expand(data_name=list_datasets()))
 
-    run_fetchdata = PythonOperator(
-        task_id="run_fetchdata",
-        python_callable=os.system,
-        op_args=[f"python3 {FETCH_DATA_PATH}"],
-    )
+    # summary refresh once every dataset is loaded
+    publish(counties, loaded)
+    [counties, loaded] >> fail_run()
 
-    # fetching data task
-    run_fetchdata
\ No newline at end of file
+md_data_extraction()
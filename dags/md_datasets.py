@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module defines the Airflow Datasets the pipeline DAGs
+share: md_data_extraction emits MD_DATA when a load changed
+the warehouse, and pipeline_api_and_refresh is scheduled on it.
+"""
+
+try:
+    from airflow.sdk import Asset as Dataset
+except ImportError:  # Airflow 2
+    from airflow.datasets import Dataset
+
+# The summary tables md_data_extraction refreshes after a load
+MD_DATA = Dataset("postgres://postgres:5432/final_project/md_data/overview_agg")
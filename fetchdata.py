@@ -6,11 +6,31 @@ Maryland's open data API endpoints, saves the raw data,
 and processes it into cleaned CSV files.
 """
 
+import argparse
+import hashlib
 import requests
 import json
 import os
+import time
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from mdprocessingutils import *
+from mdhttpcache import CACHE_DIR, cached_get
+from mdprofiling import current_run, finish_run, stage, start_run, stop_run
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is skipped without pyarrow
+    pa = None
+
+try:
+    import fcntl
+except ImportError:  # state files are not locked on Windows
+    fcntl = None
 
 # Creating dictionary of Maryland API endpoints
 MD_API_DICT = {
@@ -30,90 +50,768 @@ COLS_TO_COMBINE = {"md_air_enforcement":['ai',
                                            ' - '],
                    }
 
-def link_check(URL):
-    """Checks if the API endpoint is reachable."""
+# Declared column order of the cleaned enforcement files, so
+# every batch is written with the same header
+CLEAN_COLUMNS = {"md_air_enforcement": ['county',
+                                        'action_description',
+                                        'achieved_date',
+                                        'addressinfo',
+                                        'documents',
+                                        'city',
+                                        'state',
+                                        'zip',
+                                        'ai_combined',
+                                        'row_hash'],
+                 "md_water_enforcement": ['addressinfo',
+                                          'county',
+                                          'enforcement_action',
+                                          'enforcement_action_no',
+                                          'enforcement_action_issued',
+                                          'case_closed',
+                                          'media',
+                                          'program',
+                                          'upload_id',
+                                          'city',
+                                          'state',
+                                          'zip',
+                                          'ai_combined',
+                                          'row_hash'],
+                 }
+
+# Declared Parquet column types of the cleaned datasets. "*"
+# covers the remaining columns, e.g. the per-county wage columns.
+PARQUET_TYPES = {"md_air_enforcement": {'county': 'category',
+                                        'achieved_date': 'timestamp',
+                                        'city': 'category',
+                                        'state': 'category',
+                                        'zip': 'int32',
+                                        '*': 'string'},
+                 "md_water_enforcement": {'county': 'category',
+                                          'enforcement_action': 'category',
+                                          'enforcement_action_issued': 'timestamp',
+                                          'case_closed': 'timestamp',
+                                          'media': 'category',
+                                          'program': 'category',
+                                          'city': 'category',
+                                          'state': 'category',
+                                          'zip': 'int32',
+                                          '*': 'string'},
+                 "Maryland_Average_Wage_Per_Job_(Current_Dollars)__2014-2024": {
+                     'Date created': 'date',
+                     'Year': 'int16',
+                     '*': 'int32'},
+                 }
+
+# Source formats of the timestamp and date columns
+DATE_FORMATS = {'timestamp': '%Y-%m-%dT%H:%M:%S.%f',
+                'date': '%m/%d/%Y'}
+
+PARQUET_COMPRESSION = 'zstd'
+
+# Records per batch when streaming raw files through cleaning.
+# With a memory budget the batch size is derived from a sample
+# of the file instead; TRANSFORM_OVERHEAD allows for the working
+# copies pandas makes while a batch is transformed.
+BATCH_SIZE = 10000
+MEMORY_BUDGET_MB = 256
+TRANSFORM_OVERHEAD = 4
+SAMPLE_ROWS = 1000
+MIN_BATCH_SIZE = 100
+
+# Incremental extraction state. The watermark is the Socrata
+# system field :updated_at, which moves on inserts and corrections.
+STATE_DIR = os.path.join(CURRENT_DIR, "state")
+WATERMARK_PATH = os.path.join(STATE_DIR, "watermarks.json")
+WATERMARK_FIELD = ":updated_at"
+
+# Transform manifest: input hash and code version per cleaned file
+MANIFEST_PATH = os.path.join(STATE_DIR, "transform_manifest.json")
+TRANSFORM_SOURCES = [os.path.abspath(__file__),
+                     os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "mdprocessingutils.py")]
+
+# The Socrata row id, selected with every record; it stays the same when
+# a record's fields are corrected, so deltas are merged on it
+RECORD_KEY = ':id'
+
+# Socrata paging and connection settings
+PAGE_SIZE = 50000
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 1.0
+REQUEST_TIMEOUT = 60
+
+def get_session(max_workers=MAX_WORKERS):
+    """
+    Builds a requests Session with a connection pool sized
+    for the page workers and retries with exponential backoff
+    on connection errors, throttling and server errors.
+    """
+    retry = Retry(total=MAX_RETRIES,
+                  backoff_factor=BACKOFF_FACTOR,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"),
+                  raise_on_status=False,
+                  )
+    adapter = HTTPAdapter(pool_connections=max_workers,
+                          pool_maxsize=max_workers,
+                          max_retries=retry,
+                          )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def link_check(URL, session=None):
+    """
+    Checks if the API endpoint is reachable with a
+    single-row probe instead of downloading the dataset.
+    """
+    session = session or requests
     try:
 
-        response = requests.get(URL)
+        response = session.get(URL,
+                               params={"$limit": 1},
+                               timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
 
         return response.status_code
     
-    except requests.exceptions.RequestException:
+    except requests.exceptions.RequestException as e:
 
-        return response.status_code
+        response = getattr(e, "response", None)
+        return response.status_code if response is not None else None
 
+def count_records(URL, session, where=None):
+    """
+    Returns the number of rows the endpoint will serve,
+    or None if the count query is not supported.
+    """
+    params = {"$select": "count(*) AS n"}
+    if where:
+        params["$where"] = where
+    try:
+        response = session.get(URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return int(response.json()[0]["n"])
+    except (requests.exceptions.RequestException,
+            ValueError, KeyError, IndexError):
+        return None
 
-def fetch_data(URL):
+def fetch_page(URL, session, offset, limit=PAGE_SIZE, where=None):
     """
-    Fetch data from the given URL
-    and return it as a JSON object.
+    Fetch a single page of rows ordered by the Socrata row id
+    so that offsets are stable between requests. The row id is
+    included in each record for merging deltas.
     """
-    response = requests.get(URL)
+    params = {"$select": f"{RECORD_KEY},*",
+              "$limit": limit,
+              "$offset": offset,
+              "$order": RECORD_KEY}
+    if where:
+        params["$where"] = where
+    response = session.get(URL, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
     return response.json()
 
-if __name__ == "__main__":
+def iter_pages_from(URL, session, offset=0, page_size=PAGE_SIZE, where=None):
+    """
+    Yield pages of rows serially from the given offset
+    until a short page is returned.
+    """
+    while True:
+        page = fetch_page(URL, session, offset, page_size, where)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
 
-    # create raw_data directory to store unprocessed data
-    os.makedirs("raw_data",exist_ok=True)
+def iter_pages(URL, session=None, page_size=PAGE_SIZE,
+               max_workers=MAX_WORKERS, where=None):
+    """
+    Yield pages of rows from the given URL in order.
+    Pages are fetched concurrently when the row count is known,
+    otherwise serially until a short page is returned.
+    """
+    session = session or get_session(max_workers)
+    total = count_records(URL, session, where)
 
-    # iterate through the API dictionary and save data
-    for data_name, api_url in MD_API_DICT.items():
+    if total is None:
+        yield from iter_pages_from(URL, session, 0, page_size, where)
+        return
+
+    offsets = range(0, total, page_size)
+    last_page = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map keeps page order while the pool works ahead
+        for last_page in executor.map(
+            lambda offset: fetch_page(URL, session, offset, page_size, where),
+            offsets,
+        ):
+            yield last_page
+
+    # rows added after the count sit past the planned pages
+    if last_page is None or len(last_page) == page_size:
+        yield from iter_pages_from(URL, session, len(offsets) * page_size,
+                                   page_size, where)
+
+def fetch_data(URL, session=None, page_size=PAGE_SIZE,
+               max_workers=MAX_WORKERS, where=None):
+    """
+    Fetch every row from the given URL and return it
+    as a list of JSON records.
+    """
+    data = []
+    for page in iter_pages(URL, session, page_size, max_workers, where):
+        data.extend(page)
+    return data
+
+def get_watermark(URL, session, cache_dir=CACHE_DIR):
+    """
+    Returns (watermark, not_modified) for the endpoint, where
+    watermark is its current max :updated_at (or None if it cannot
+    be determined). The query is sent conditionally through the
+    response cache, so not_modified is True when the server answers
+    304 because the dataset has not changed since the last run.
+    """
+    params = {"$select": f"max({WATERMARK_FIELD}) AS wm"}
+    try:
+        if cache_dir:
+            body, not_modified = cached_get(session,
+                                            URL,
+                                            params,
+                                            cache_dir,
+                                            timeout=REQUEST_TIMEOUT)
+        else:
+            response = session.get(URL,
+                                   params=params,
+                                   timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            body, not_modified = response.content, False
+        return json.loads(body)[0].get("wm"), not_modified
+    except (requests.exceptions.RequestException,
+            ValueError, KeyError, IndexError):
+        return None, False
+
+def load_watermarks(path=WATERMARK_PATH):
+    """Reads the stored per-dataset watermarks."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_watermarks(watermarks, path=WATERMARK_PATH):
+    """Writes the per-dataset watermarks."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(watermarks, f, indent=4)
+
+@contextmanager
+def state_lock(path):
+    """
+    Holds an exclusive lock on a state file while it is read,
+    updated and rewritten, so per-dataset tasks running in
+    parallel do not overwrite each other's entries.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+def update_state(path, key, value):
+    """Sets one entry of a JSON state file under its lock."""
+    with state_lock(path):
+        state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        state[key] = value
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, path)
+
+def write_ndjson(pages, path):
+    """
+    Streams pages of records to a newline-delimited JSON file
+    as they arrive and returns the number of records written.
+    The file only replaces the previous snapshot once complete.
+    """
+    tmp_path = f"{path}.tmp"
+    n_records = 0
+    with open(tmp_path, "w") as f:
+        for page in pages:
+            for record in page:
+                f.write(json.dumps(record))
+                f.write("\n")
+            n_records += len(page)
+    os.replace(tmp_path, path)
+    return n_records
+
+def has_record_keys(path, key=RECORD_KEY):
+    """
+    Returns whether an NDJSON snapshot carries record keys;
+    snapshots saved before the row id was selected do not.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                return key in json.loads(line)
+    return False
+
+def merge_ndjson(path, new, key=RECORD_KEY):
+    """
+    Merges new records into an NDJSON snapshot line by line.
+    A stored record sharing a key with a new record is replaced
+    in place, so the snapshot keeps the order of a full pull;
+    records with new keys are appended at the end.
+    """
+    new = {r[key]: r for r in new}
+    tmp_path = f"{path}.tmp"
+    with open(path) as src, open(tmp_path, "w") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            record = new.pop(json.loads(line).get(key), None)
+            if record is None:
+                dst.write(line if line.endswith("\n") else line + "\n")
+            else:
+                dst.write(json.dumps(record))
+                dst.write("\n")
+        for record in new.values():
+            dst.write(json.dumps(record))
+            dst.write("\n")
+    os.replace(tmp_path, path)
+
+def clean_enforcement_batch(df, data_name):
+    """
+    Applies the mdprocessingutils cleaning steps to a batch
+    of enforcement records and adds a row content hash.
+    """
+    df = parse_city_state_zip(df,'city_state_zip')
+    df = combine_key_cols(df,*COLS_TO_COMBINE[data_name])
+    df = df.reindex(columns=CLEAN_COLUMNS[data_name][:-1])
+
+    # content hash used by the loader to skip unchanged rows
+    df['row_hash'] = hash_rows(df)
+
+    return df
+
+def read_raw(path, **kwargs):
+    """
+    Reads a raw CSV or NDJSON file with stable string dtypes,
+    passing kwargs such as chunksize or nrows through to pandas.
+    """
+    if os.path.splitext(path)[1] == '.ndjson':
+        return pd.read_json(path,
+                            lines=True,
+                            dtype=False,
+                            convert_dates=False,
+                            **kwargs)
+    return pd.read_csv(path, dtype=str, **kwargs)
+
+def estimate_batch_size(path, memory_budget_mb=MEMORY_BUDGET_MB):
+    """
+    Estimates how many rows of a raw file fit in the memory
+    budget by measuring the in-memory size of a sample.
+    """
+    sample = read_raw(path, nrows=SAMPLE_ROWS)
+    if sample.empty:
+        return BATCH_SIZE
+    row_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    return max(MIN_BATCH_SIZE,
+               int(budget_bytes / (row_bytes * TRANSFORM_OVERHEAD)))
 
-        status_code = link_check(api_url)
-        save_path = os.path.join(CURRENT_DIR, "raw_data", f"{data_name}.json")
+def column_type(data_name, column):
+    """Returns the declared Parquet type name of a column."""
+    types = PARQUET_TYPES.get(data_name, {})
+    return types.get(column, types.get('*', 'string'))
+
+def arrow_schema(data_name, columns):
+    """Builds the pyarrow schema of a cleaned dataset."""
+    arrow_types = {'string': pa.string(),
+                   'category': pa.dictionary(pa.int32(), pa.string()),
+                   'timestamp': pa.timestamp('ms'),
+                   'date': pa.date32(),
+                   'int16': pa.int16(),
+                   'int32': pa.int32(),
+                   }
+    return pa.schema([(c, arrow_types[column_type(data_name, c)])
+                      for c in columns])
+
+def to_typed(df, data_name):
+    """
+    Converts a cleaned batch to the declared column types: dates
+    are parsed, and wage figures such as "55,389" become integers.
+    """
+    typed = {}
+    for col in df.columns:
+        col_type = column_type(data_name, col)
+        series = df[col]
+        if col_type in DATE_FORMATS:
+            series = pd.to_datetime(series,
+                                    format=DATE_FORMATS[col_type],
+                                    errors='coerce')
+        elif col_type in ('int16', 'int32'):
+            if not pd.api.types.is_numeric_dtype(series):
+                series = series.str.replace(',', '', regex=False)
+            series = (pd.to_numeric(series, errors='coerce')
+                      .astype(col_type.capitalize()))
+        elif col_type == 'category':
+            series = series.astype('category')
+        else:
+            series = series.astype('string')
+        typed[col] = series
+    return pd.DataFrame(typed, index=df.index)
+
+def clean_file(path, processed_path, data_name, batch_size=BATCH_SIZE):
+    """
+    Reads a raw file in fixed-size batches, cleans each batch and
+    appends it to the processed CSV and, when pyarrow is available,
+    to a typed Parquet file next to it. Memory is bounded by the
+    batch size rather than the dataset size. Returns rows written.
+    """
+    tmp_path = f"{processed_path}.tmp"
+    parquet_path = parquet_path_for(processed_path)
+    tmp_parquet_path = f"{parquet_path}.tmp"
+    writer = None
+    n_rows = 0
+    try:
+        with read_raw(path, chunksize=batch_size) as reader:
+            for i, batch in enumerate(reader):
+                if data_name in COLS_TO_COMBINE:
+                    batch = clean_enforcement_batch(batch, data_name)
+                batch.to_csv(tmp_path,
+                             mode="w" if i == 0 else "a",
+                             header=(i == 0),
+                             index=False)
+                if pa is not None:
+                    schema = arrow_schema(data_name, batch.columns)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_parquet_path,
+                                                  schema,
+                                                  compression=PARQUET_COMPRESSION)
+                    writer.write_table(
+                        pa.Table.from_pandas(to_typed(batch, data_name),
+                                             schema=schema,
+                                             preserve_index=False))
+                n_rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, processed_path)
+    if os.path.exists(tmp_parquet_path):
+        os.replace(tmp_parquet_path, parquet_path)
+    return n_rows
+
+def file_hash(path, block_size=1024 * 1024):
+    """Returns the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def code_version():
+    """
+    Returns a hash of the transform source files, so cleaned
+    output is rebuilt whenever the cleaning code changes.
+    """
+    digest = hashlib.sha256()
+    for path in TRANSFORM_SOURCES:
+        digest.update(file_hash(path).encode("utf-8"))
+    return digest.hexdigest()
+
+def load_manifest(path=MANIFEST_PATH):
+    """Reads the transform manifest."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Writes the transform manifest."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=4)
+
+def processed_path_for(path):
+    """Returns the cleaned CSV path for a raw file."""
+    data_name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CURRENT_DIR,
+                        "clean_data",
+                        f"{data_name}_cleaned.csv")
+
+def parquet_path_for(processed_path):
+    """Returns the typed Parquet path next to a cleaned CSV."""
+    return f"{os.path.splitext(processed_path)[0]}.parquet"
+
+def transform_file(path, memory_budget_mb=MEMORY_BUDGET_MB):
+    """
+    Cleans one raw file with batches sized to the memory budget.
+    Runs in a worker process; returns a summary of the run,
+    including the worker's profile of the transform.
+    """
+    start = time.perf_counter()
+    data_name = os.path.splitext(os.path.basename(path))[0]
+    # a run of its own, as the worker cannot reach the parent's
+    start_run(f"transform_{data_name}")
+    try:
+        with stage(f"transform:{data_name}") as record:
+            batch_size = estimate_batch_size(path, memory_budget_mb)
+            n_rows = clean_file(path,
+                                processed_path_for(path),
+                                data_name,
+                                batch_size)
+            # cleaning keeps every row
+            record.update(rows_in=n_rows, rows_out=n_rows,
+                          batch_size=batch_size)
+    finally:
+        profile = stop_run()
+    return {"data_name": data_name,
+            "rows": n_rows,
+            "batch_size": batch_size,
+            "seconds": time.perf_counter() - start,
+            "profile": profile.report(),
+            }
+
+def transform_entry(path, version, manifest, force=False):
+    """
+    Returns the manifest entry of a raw file if it needs cleaning,
+    or None when its contents and the transform code are unchanged
+    since the last run and its cleaned outputs exist.
+    """
+    data_name = os.path.splitext(os.path.basename(path))[0]
+    entry = {"input_hash": file_hash(path), "code_version": version}
+    outputs = [processed_path_for(path)]
+    if pa is not None:
+        outputs.append(parquet_path_for(outputs[0]))
+    if (not force
+        and manifest.get(data_name) == entry
+        and all(os.path.exists(p) for p in outputs)):
+        return None
+    return entry
+
+def run_transforms(file_paths, memory_budget_mb=MEMORY_BUDGET_MB,
+                   max_workers=None, force=False):
+    """
+    Cleans raw files in parallel in a process pool, skipping files
+    whose contents and transform code are unchanged since the last
+    run. Returns the summaries of the files that were cleaned.
+    """
+    manifest = load_manifest()
+    version = code_version()
+
+    pending = {}
+    for path in file_paths:
+        if os.path.splitext(path)[1] not in ('.csv', '.ndjson'):
+            continue
+        entry = transform_entry(path, version, manifest, force)
+        if entry is None:
+            print('Skipping unchanged:',
+                  os.path.splitext(os.path.basename(path))[0])
+            continue
+        pending[path] = entry
+
+    results = []
+    if not pending:
+        return results
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(pending))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {path: executor.submit(transform_file,
+                                         path,
+                                         memory_budget_mb)
+                   for path in pending}
+        for path, future in futures.items():
+            result = future.result()
+            # only recorded once the cleaned file is complete
+            update_state(MANIFEST_PATH, result["data_name"], pending[path])
+            if current_run() is not None:
+                current_run().merge(result["profile"])
+            results.append(result)
+
+    return results
+
+def raw_path_for(data_name):
+    """Returns the raw file of a dataset, NDJSON or CSV."""
+    for ext in ('.ndjson', '.csv'):
+        path = os.path.join(CURRENT_DIR, "raw_data", f"{data_name}{ext}")
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No raw file for {data_name} in raw_data")
+
+def transform_dataset(data_name, memory_budget_mb=MEMORY_BUDGET_MB,
+                      force=False):
+    """
+    Cleans one dataset in this process unless its raw file and the
+    transform code are unchanged. Returns the transform summary,
+    with "skipped" set when nothing was cleaned.
+    """
+    path = raw_path_for(data_name)
+    entry = transform_entry(path, code_version(), load_manifest(), force)
+    if entry is None:
+        print('Skipping unchanged:',data_name)
+        return {"data_name": data_name, "rows": 0, "skipped": "unchanged"}
+    os.makedirs(os.path.join(CURRENT_DIR, "clean_data"), exist_ok=True)
+    result = transform_file(path, memory_budget_mb)
+    update_state(MANIFEST_PATH, data_name, entry)
+    return result
+
+def extract_dataset(data_name, api_url=None, session=None,
+                    cache_dir=CACHE_DIR, incremental=True):
+    """
+    Fetches one dataset into raw_data/ and returns a summary with
+    the rows fetched, or why nothing was fetched ("skipped") or
+    why the endpoint could not be reached ("error"). Incremental
+    runs merge the rows updated since the stored watermark into
+    the snapshot; otherwise the whole dataset is fetched again.
+    """
+    api_url = api_url or MD_API_DICT[data_name]
+    session = session or get_session()
+    save_path = os.path.join(CURRENT_DIR,
+                             "raw_data",
+                             f"{data_name}.ndjson")
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    summary = {"data_name": data_name, "rows": 0}
+
+    # extraction wall time, records and bytes per dataset
+    with stage(f"extract:{data_name}") as record:
+
+        status_code = link_check(api_url, session)
 
         if status_code == 200:
 
-            data = fetch_data(api_url)
-            with open(save_path, "w") as f:
-                json.dump(data, f, indent=4)
-            print(f"Data from {data_name} fetched and saved \
+            # taken before the fetch so rows updated mid-run are
+            # picked up again next time rather than missed
+            new_watermark, not_modified = get_watermark(api_url,
+                                                        session,
+                                                        cache_dir)
+            old_watermark = load_watermarks().get(data_name)
+
+            # the stored watermark is only written after a successful
+            # save, so comparing against it also guards against a run
+            # that refreshed the cached probe but failed mid-download
+            if (cache_dir
+                and os.path.exists(save_path)
+                and new_watermark is not None
+                and new_watermark == old_watermark):
+
+                reason = "304 Not Modified" if not_modified else "same watermark"
+                summary["skipped"] = reason
+                print(f"No changes to {data_name} since the last run \
+({reason}).")
+
+            else:
+
+                # snapshots without row ids are fetched in full once
+                if (incremental
+                    and old_watermark
+                    and os.path.exists(save_path)
+                    and has_record_keys(save_path)):
+
+                    where = f"{WATERMARK_FIELD} > '{old_watermark}'"
+                    delta = fetch_data(api_url, session, where=where)
+                    merge_ndjson(save_path, delta)
+                    summary["rows"] = len(delta)
+                    print(f"Fetched {len(delta)} new or updated rows \
+for {data_name}.")
+
+                else:
+
+                    # records are written page by page as they arrive
+                    summary["rows"] = write_ndjson(iter_pages(api_url,
+                                                              session),
+                                                   save_path)
+
+                if new_watermark:
+                    update_state(WATERMARK_PATH, data_name, new_watermark)
+                print(f"Data from {data_name} fetched and saved \
 successfully.")
 
         else:
 
+            summary["error"] = f"status code {status_code}"
             print(
                 f"Failed to reach the API endpoint for {data_name}. \
 Status code: {status_code}"
             )
+
+        record.update({k: v for k, v in summary.items() if k != "data_name"},
+                      rows_out=summary["rows"])
+    return summary
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incremental",
+                        action="store_true",
+                        help="only fetch rows updated since the last run "
+                             "and merge them into raw_data")
+    parser.add_argument("--no-cache",
+                        action="store_true",
+                        help="skip conditional requests and always "
+                             "fetch and clean every dataset")
+    parser.add_argument("--memory-budget-mb",
+                        type=int,
+                        default=MEMORY_BUDGET_MB,
+                        help="approximate memory available to each "
+                             "cleaning worker; sets the batch size")
+    parser.add_argument("--workers",
+                        type=int,
+                        default=None,
+                        help="number of cleaning processes "
+                             "(defaults to the number of CPUs)")
+    parser.add_argument("--profile-report",
+                        default=None,
+                        help="where to write the JSON run report "
+                             "(defaults to $MD_PROFILE_REPORT, else "
+                             "profiles/fetchdata_<time>.json)")
+    args = parser.parse_args()
+
+    # wall time, rows, bytes and peak memory per stage
+    start_run("fetchdata")
+
+    # create raw_data directory to store unprocessed data
+    os.makedirs("raw_data",exist_ok=True)
+
+    # one pooled session is shared by every endpoint and page
+    session = get_session()
+    cache_dir = None if args.no_cache else CACHE_DIR
+
+    # iterate through the API dictionary and save data
+    for data_name, api_url in MD_API_DICT.items():
+        extract_dataset(data_name,
+                        api_url,
+                        session,
+                        cache_dir,
+                        args.incremental)
     
     # read in file paths from raw_data directory
     raw_data_path = os.path.join(CURRENT_DIR,'raw_data')
     file_paths = get_all_file_paths(raw_data_path)
     os.makedirs("clean_data",exist_ok=True) # make clean_data dir
 
-    # iterate through file paths and read into DataFrames
-    for path in file_paths:
-        data_name = os.path.splitext(os.path.basename(path))[0]
-        processed_path = os.path.join(CURRENT_DIR,
-                                      "clean_data",
-                                      f"{data_name}_cleaned.csv")
-        if '.csv' in path:
-            df = pd.read_csv(path)
-            # Additional processing steps from mdprocessingutils
-            df.to_csv(processed_path,index=False)
-            print('Successfully processed:',data_name)
-
-        elif '.json' in path:
-            df = pd.read_json(path)
-            # Additional processing steps from mdprocessingutils
-            df = string_split_column(df,'city_state_zip',',')
-            df = rename_split_columns(df,'city_state_zip')
-            combine_cols_params = COLS_TO_COMBINE.get(data_name)
-            combine_cols_params.insert(0,df)
-            df = combine_2_cols(*tuple(combine_cols_params))
-
-            # Only keeping the first part of the zip code
-            # and forcing to be an integer
-            df['zip'] = df['zip'].str.strip()
-            df['zip'] = df['zip'].str.split('-').str[0]
-            df['zip'] = (pd.to_numeric(df['zip'],
-                                       errors='coerce')
-                         .fillna(0)
-                         .astype(int)
-                         )
-            
-            # 
-            df.to_csv(processed_path,index=False)
-            print('Successfully processed:',data_name)
\ No newline at end of file
+    # clean files in parallel; files whose raw contents are unchanged
+    # (including datasets the portal reported as not modified) are
+    # skipped through the transform manifest
+    with stage("transform") as record:
+        results = run_transforms(file_paths,
+                                 args.memory_budget_mb,
+                                 args.workers,
+                                 force=args.no_cache)
+        record["rows_out"] = sum(r["rows"] for r in results)
+
+    # per-file wall time, slowest first
+    for result in sorted(results, key=lambda r: r["seconds"], reverse=True):
+        print('Successfully processed:',result["data_name"],
+              f'({result["rows"]} rows in {result["seconds"]:.2f}s, '
+              f'batches of {result["batch_size"]})')
+
+    report, report_path = finish_run(args.profile_report)
+    print(f"Run report written to {report_path} "
+          f"({report['seconds']:.2f}s, peak RSS {report['peak_rss_mb']} MB)")
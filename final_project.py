@@ -1,165 +1,564 @@
+import io
+import os
+import re
+import time
 import psycopg2
 import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from psycopg2.pool import ThreadedConnectionPool
+
+from mdprocessingutils import hash_rows
+from mdcounties import alias_table, county_dimension, resolve_counties
+from mdprofiling import finish_run, profiled, stage, start_run
+
+try:
+    import pyarrow.parquet as pq  # also enables pd.read_parquet
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# PostgreSQL connection (host=localhost since you're running Python on your Mac).
+# The standard libpq variables override the defaults, e.g. PGHOST=postgres.
+DB_PARAMS = {
+    "host": os.environ.get("PGHOST", "localhost"),   # not container name; use localhost
+    "port": os.environ.get("PGPORT", "5432"),
+    "database": os.environ.get("PGDATABASE", "final_project"),  # all lowercase to match your created DB
+    "user": os.environ.get("PGUSER", "jhu"),
+    "password": os.environ.get("PGPASSWORD", "jhu123"),
+}
+
+WAGE_DATASET = "Maryland_Average_Wage_Per_Job_(Current_Dollars)__2014-2024"
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "final_project_db.sql")
+
+# Tables keyed on natural keys whose values are upserted rather than
+# insert-only, so corrected figures replace the stored ones
+UPSERT_TABLES = {"counties", "county_aliases",
+                 "average_wage_maryland", "average_wage_per_county"}
+
+# Tables loaded whole for each year they hold: stored rows for a loaded
+# year that the load no longer produces (e.g. wages still under a county
+# id from before counties were re-keyed) are deleted
+SNAPSHOT_TABLES = {"average_wage_per_county": "year"}
+
+# Summary tables and their refresh functions in final_project_db.sql
+SUMMARY_TABLES = {"overview_agg": "md_data.refresh_overview_agg",
+                  "enforcement_rollup": "md_data.refresh_enforcement_rollup"}
+
+# Tables the summaries are built from; loads report the (county_id, year)
+# keys they change so only those summary rows are recomputed
+SUMMARY_SOURCES = {"air_enforcements_in_md", "water_enforcements_in_md",
+                    "average_wage_per_county"}
+
+# Independent tables load concurrently, one pooled connection each
+MAX_LOAD_WORKERS = int(os.environ.get("LOAD_WORKERS", "4"))
+
+# Cleaned datasets in load order and the columns read from each
+DATASETS = ["md_air_enforcement", "md_water_enforcement", WAGE_DATASET]
+AIR_COLUMNS = ["ai_combined", "achieved_date", "action_description", "addressinfo",
+               "city", "zip", "county", "documents", "row_hash"]
+WATER_COLUMNS = ["ai_combined", "upload_id", "addressinfo", "city", "program",
+                 "enforcement_action", "enforcement_action_no", "zip", "county",
+                 "enforcement_action_issued", "case_closed", "media", "row_hash"]
+
+
+def get_connection():
+    return psycopg2.connect(**DB_PARAMS)
+
+
+def get_pool(max_workers=MAX_LOAD_WORKERS):
+    return ThreadedConnectionPool(1, max_workers, **DB_PARAMS)
+
+
+# Table dependencies from the foreign keys declared in final_project_db.sql,
+# e.g. {"average_wage_per_county": {"counties", "average_wage_maryland"}}
+def read_table_dependencies(sql_path=SCHEMA_SQL):
+    with open(sql_path) as f:
+        sql = f.read()
+    blocks = re.split(r"CREATE TABLE md_data\.", sql)[1:]
+    dependencies = {}
+    for block in blocks:
+        table = re.match(r"\w+", block).group(0)
+        refs = set(re.findall(r"REFERENCES md_data\.(\w+)", block))
+        dependencies[table] = refs - {table}
+    return dependencies
+
+
+# Read a cleaned dataset, preferring the typed Parquet file written by
+# fetchdata.py (only the needed columns, no CSV parsing) over the CSV.
+# Parquet columns keep their nullable integer and date types; CSV columns
+# come back as text and floats for to_int and to_date to convert.
+def read_clean(name, columns=None):
+    with stage(f"read:{name}") as record:
+        parquet_path = f"clean_data/{name}_cleaned.parquet"
+        if HAS_PARQUET and os.path.exists(parquet_path):
+            available = pq.read_schema(parquet_path).names
+            df = pd.read_parquet(parquet_path,
+                                 columns=[c for c in columns if c in available] if columns else None,
+                                 dtype_backend="numpy_nullable")
+        else:
+            df = pd.read_csv(f"clean_data/{name}_cleaned.csv",
+                             usecols=(lambda c: c in columns) if columns else None)
+        if columns:
+            # files cleaned before a column was added (e.g. row_hash)
+            df = df.reindex(columns=columns)
+        record["rows_out"] = len(df)
+        return df
+
+
+# Row hashes are computed by fetchdata.py; older cleaned files without
+# them are hashed here so change detection still works
+def ensure_row_hash(df):
+    if df["row_hash"].isna().any():
+        df = df.copy()
+        df["row_hash"] = hash_rows(df.drop(columns="row_hash"))
+    return df
+
+
+# Wage figures arrive as "55,389" in the CSV and as integers in Parquet;
+# zips as integers, or as floats ("20629.0") from a CSV with blank zips.
+# Integer columns go through this before COPY so INT columns never get
+# floats; typed Parquet columns are passed through as they are
+def to_int(series):
+    if pd.api.types.is_integer_dtype(series):
+        return series
+    cleaned = series.astype(str).str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce").astype("Int64")
+
+
+# Dates arrive as Timestamps or dates from Parquet and as
+# "2021-02-04T00:00:00.000" or "10/06/2025" strings from the CSVs; COPY
+# gets ISO dates, NULL otherwise. Parquet timestamps are passed through
+# and written as dates by copy_load
+def to_date(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors="coerce", format="mixed").dt.strftime("%Y-%m-%d")
+
+
+# Resolve a column of county names to county ids through the shared alias
+# index, reporting names that match no county
+def county_ids(names, label):
+    ids, unmatched = resolve_counties(names)
+    if unmatched:
+        print(f"{label}: unmatched county names {unmatched} "
+              f"({int(names.notna().sum() - ids.notna().sum())} rows)")
+    return ids
+
+
+# Keep only rows whose content hash is new or differs from the hash
+# stored in the target, so unchanged rows are never sent in full. Only
+# the key, hash and county_id of each row are copied to a staging table
+# and compared in SQL; a row also counts as changed when its county
+# resolves differently. Duplicate keys keep their first row, as ON
+# CONFLICT DO NOTHING did.
+def filter_changed(cur, df, table, key_col):
+    df = df.drop_duplicates(subset=[key_col], keep="first")
+    staging = f"stg_hash_{table}"
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+        SELECT {key_col}, row_hash, county_id FROM md_data.{table} WITH NO DATA;
+    """)
+    buf = io.StringIO()
+    df[[key_col, "row_hash", "county_id"]].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {staging} FROM STDIN WITH (FORMAT csv)", buf
+    )
+    cur.execute(f"""
+        SELECT s.{key_col}
+        FROM {staging} s
+        LEFT JOIN md_data.{table} t USING ({key_col})
+        WHERE ROW(t.row_hash, t.county_id)
+              IS DISTINCT FROM ROW(s.row_hash, s.county_id);
+    """)
+    changed = {row[0] for row in cur.fetchall()}
+    return df, df[df[key_col].isin(changed).to_numpy()]
+
+
+# Stream a DataFrame into a temporary staging table shaped like the
+# target with COPY FROM STDIN, then move it into the target with one
+# set-based INSERT ... SELECT. The staging table is dropped on commit.
+# With update=True existing keys are updated when their content differs
+# (by row_hash and county_id where the table has a row_hash).
+# With prune set to a column, stored rows sharing a loaded value of that
+# column but missing from the load are deleted.
+# With track_keys=True the (county_id, year) keys of the rows inserted,
+# updated, deleted, or moved away from by an update are collected as well.
+# Returns (inserted, updated, deleted, touched keys).
+def copy_load(cur, df, table, key_cols=None, update=False, track_keys=False,
+              prune=None):
+    staging = f"stg_{table}"
+    cols = ", ".join(df.columns)
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging}
+        (LIKE md_data.{table} INCLUDING DEFAULTS)
+        ON COMMIT DROP;
+    """)
+
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, date_format="%Y-%m-%d")
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv)", buf
+    )
+
+    conflict = f"({', '.join(key_cols)})" if key_cols else ""
+    returning = "RETURNING county_id, year" if track_keys else ""
+    if not update:
+        cur.execute(f"""
+            INSERT INTO md_data.{table} ({cols})
+            SELECT {cols} FROM {staging}
+            ON CONFLICT {conflict} DO NOTHING
+            {returning};
+        """)
+        touched = set(cur.fetchall()) if track_keys else set()
+        return cur.rowcount, 0, 0, touched
+
+    value_cols = [c for c in df.columns if c not in key_cols]
+    compare = ([c for c in ("row_hash", "county_id") if c in value_cols]
+               if "row_hash" in value_cols else value_cols)
+    touched = set()
+    if track_keys:
+        # keys that rows about to be updated are counted under now
+        cur.execute(f"""
+            SELECT t.county_id, t.year
+            FROM md_data.{table} t
+            JOIN {staging} s USING ({", ".join(key_cols)})
+            WHERE ROW({", ".join(f"t.{c}" for c in compare)})
+                  IS DISTINCT FROM ROW({", ".join(f"s.{c}" for c in compare)});
+        """)
+        touched.update(cur.fetchall())
+    cur.execute(f"""
+        INSERT INTO md_data.{table} AS t ({cols})
+        SELECT {cols} FROM {staging}
+        ON CONFLICT {conflict} DO UPDATE SET
+            {", ".join(f"{c} = EXCLUDED.{c}" for c in value_cols)}
+        WHERE ROW({", ".join(f"t.{c}" for c in compare)})
+              IS DISTINCT FROM ROW({", ".join(f"EXCLUDED.{c}" for c in compare)})
+        RETURNING (xmax = 0) AS inserted{", county_id, year" if track_keys else ""};
+    """)
+    returned = cur.fetchall()
+    flags = [row[0] for row in returned]
+    touched.update(row[1:] for row in returned if track_keys)
+
+    deleted = 0
+    if prune:
+        cur.execute(f"""
+            DELETE FROM md_data.{table} t
+            WHERE t.{prune} IN (SELECT {prune} FROM {staging})
+              AND NOT EXISTS (
+                  SELECT 1 FROM {staging} s
+                  WHERE {" AND ".join(f"s.{c} = t.{c}" for c in key_cols)})
+            {returning};
+        """)
+        deleted = cur.rowcount
+        if track_keys:
+            touched.update(cur.fetchall())
+    return sum(flags), len(flags) - sum(flags), deleted, touched
+
+
+# Load one table in its own transaction and report rows/sec. Tables with
+# a row_hash column only send rows that are new or changed and upsert them.
+def load_table(conn, df, table, key_cols=None):
+    start = time.perf_counter()
+    rows = len(df)
+    track_keys = table in SUMMARY_SOURCES
+    with stage(f"load:{table}", rows_in=rows) as record:
+        with conn.cursor() as cur:
+            if "row_hash" in df.columns and key_cols:
+                df, changed = filter_changed(cur, df, table, key_cols[0])
+                inserted, updated, deleted, touched = copy_load(
+                    cur, changed, table, key_cols, update=True,
+                    track_keys=track_keys)
+                sent = len(changed)
+            else:
+                inserted, updated, deleted, touched = copy_load(
+                    cur, df, table, key_cols, update=table in UPSERT_TABLES,
+                    track_keys=track_keys, prune=SNAPSHOT_TABLES.get(table))
+                sent = rows
+        conn.commit()
+        record.update(rows_out=inserted + updated, sent=sent,
+                      inserted=inserted, updated=updated, deleted=deleted)
+    seconds = time.perf_counter() - start
+    # rows left alone by the load, whether filtered out before sending
+    # or sent and matched by an identical stored row
+    unchanged = len(df) - inserted - updated
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"{table}: {sent} of {rows} rows sent, {inserted} inserted, "
+          f"{updated} updated, {unchanged} unchanged, {deleted} deleted "
+          f"in {seconds:.2f}s ({rate:,.0f} rows/sec)")
+    return {"table": table, "rows": rows, "sent": sent,
+            "inserted": inserted, "updated": updated,
+            "unchanged": unchanged, "deleted": deleted, "seconds": seconds,
+            # NULL county or year rows are not summarized
+            "touched": {k for k in touched if None not in k}}
+
+
+# Load tables concurrently on pooled connections, starting each table as
+# soon as the tables it references have loaded. jobs maps a table name to
+# (DataFrame, key_cols). Each table loads in its own transaction.
+def load_tables(pool, jobs, dependencies, max_workers=MAX_LOAD_WORKERS):
+    def run(table):
+        df, key_cols = jobs[table]
+        conn = pool.getconn()
+        try:
+            return load_table(conn, df, table, key_cols)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+    pending = set(jobs)
+    done = set()
+    stats = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            ready = [t for t in pending
+                     if (dependencies.get(t, set()) & set(jobs)) <= done]
+            for table in ready:
+                pending.remove(table)
+                running[executor.submit(run, table)] = table
+            if not running:
+                raise RuntimeError(f"Circular table dependencies: {pending}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                # a failed table stops its dependents from starting
+                stats.append(future.result())
+                done.add(table)
+    return stats
+
+
+# Recompute the summary tables for the (county_id, year) keys changed by
+# the load. Runs in the caller's transaction; API reads of other keys are
+# not blocked and readers of these keys see the previous rows until commit.
+def refresh_summaries(conn, keys):
+    keys = sorted(keys)
+    params = ([k[0] for k in keys], [k[1] for k in keys])
+    changed = {}
+    with conn.cursor() as cur:
+        for table, function in SUMMARY_TABLES.items():
+            start = time.perf_counter()
+            with stage(f"refresh:{table}", rows_in=len(keys)) as record:
+                cur.execute(f"SELECT {function}(%s::int[], %s::int[])", params)
+                changed[table] = record["rows_out"] = cur.fetchone()[0]
+            print(f"{table}: {len(keys)} keys refreshed, {changed[table]} rows "
+                  f"changed in {time.perf_counter() - start:.2f}s")
+    return changed
+
+
+# Advance md_data.data_version so API response caches and ETags from before
+# this load are invalidated
+def bump_data_version(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT md_data.bump_data_version()")
+        version = cur.fetchone()[0]
+    print(f"data_version: {version}")
+    return version
+
+
+# Stamp md_data.data_version.loaded_at after a load that changed nothing,
+# so /health can tell an unchanged night from a missed one
+def record_load(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT md_data.record_load()")
+
+
+# Per-table timing summary, slowest first
+def print_load_summary(stats, wall_seconds):
+    print(f"{'table':<28}{'rows':>8}{'sent':>8}{'inserted':>10}{'updated':>9}"
+          f"{'unchanged':>11}{'deleted':>9}{'seconds':>9}{'rows/sec':>12}")
+    for s in sorted(stats, key=lambda s: s["seconds"], reverse=True):
+        rate = s["rows"] / s["seconds"] if s["seconds"] > 0 else float("inf")
+        print(f"{s['table']:<28}{s['rows']:>8}{s['sent']:>8}{s['inserted']:>10}"
+              f"{s['updated']:>9}{s['unchanged']:>11}{s['deleted']:>9}"
+              f"{s['seconds']:>9.2f}{rate:>12,.0f}")
+    print(f"{len(stats)} tables, {sum(s['rows'] for s in stats)} rows "
+          f"in {wall_seconds:.2f}s wall time "
+          f"({sum(s['seconds'] for s in stats):.2f}s summed across tables)")
+
+
+# 1. Counties table and the alias index used to resolve county names
+@profiled
+def prepare_counties():
+    return county_dimension()
+
+
+@profiled
+def prepare_county_aliases():
+    return alias_table()
 
-# Connect to PostgreSQL (host=localhost since you're running Python on your Mac)
-conn = psycopg2.connect(
-    host="localhost",            # not container name; use localhost
-    port="5432",
-    database="final_project",    # all lowercase to match your created DB
-    user="jhu",
-    password="jhu123"
-)
-cur = conn.cursor()
-print("Connected to final_project database!")
-
-# Load CSVs
-air_df = pd.read_csv("clean_data/md_air_enforcement_cleaned.csv")
-water_df = pd.read_csv("clean_data/md_water_enforcement_cleaned.csv")
-wage_df = pd.read_csv("clean_data/Maryland_Average_Wage_Per_Job_(Current_Dollars)__2014-2024_cleaned.csv")
-
-# 1. Counties table
-counties = pd.concat([air_df["county"], water_df["county"]]).dropna().unique().tolist()
-
-maryland_index = wage_df.columns.get_loc("MARYLAND")
-wage_counties = [
-    col.replace("County", "").strip()
-    for col in wage_df.columns[maryland_index + 1 : -1]
-]
-
-all_counties = list(set(counties + wage_counties))
-counties_df = pd.DataFrame({"county_name": all_counties})
-counties_df["county_id"] = range(1, len(counties_df) + 1)
-counties_df["state"] = counties_df["county_name"].apply(
-    lambda x: "N/A" if "Outside of Maryland" in x else "MD"
-)
-
-for _, row in counties_df.iterrows():
-    cur.execute("""
-        INSERT INTO md_data.counties (county_id, county_name, state)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (county_id) DO NOTHING;
-    """, (row["county_id"], row["county_name"], row["state"]))
-
-conn.commit()
-
-# Normalize county names for consistent matching
-def normalize_county(name):
-    if pd.isnull(name):
-        return None
-    name = name.strip().lower().replace("county", "").replace("city", "").strip()
-    return name
-
-counties_df["normalized_name"] = counties_df["county_name"].apply(normalize_county)
-county_map = dict(zip(counties_df["normalized_name"], counties_df["county_id"]))
 
 # 2. Air enforcements table
-for _, row in air_df.iterrows():
-    cur.execute("""
-        INSERT INTO md_data.air_enforcements_in_md
-        (ai_combined, achieved_date, action_description, address, city,
-         zip_code, county_id, documents)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (ai_combined) DO NOTHING;
-    """, (
-        row["ai_combined"],
-        row.get("achieved_date"),
-        row.get("action_description"),
-        row.get("addressinfo"),
-        row.get("city"),
-        row.get("zip"),
-        county_map.get(normalize_county(row["county"])),
-        row.get("documents")
-    ))
-conn.commit()
+@profiled
+def prepare_air(air_df):
+    return pd.DataFrame({
+        "ai_combined": air_df["ai_combined"],
+        "achieved_date": to_date(air_df["achieved_date"]),
+        "action_description": air_df["action_description"],
+        "address": air_df["addressinfo"],
+        "city": air_df["city"],
+        "zip_code": to_int(air_df["zip"]),
+        "county_id": county_ids(air_df["county"], "air_enforcements_in_md"),
+        "documents": air_df["documents"],
+        "row_hash": air_df["row_hash"],
+    })
+
 
 # 3. Water enforcements table
-for _, row in water_df.iterrows():
-    cur.execute("""
-        INSERT INTO md_data.water_enforcements_in_md
-        (ai_combined, upload_id, address, city, program,
-         enforcement_action, enforcement_number, zip_code, county_id,
-         enforcement_action_issued, case_closed, media)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (ai_combined) DO NOTHING;
-    """, (
-        row["ai_combined"],
-        row.get("upload_id"),
-        row.get("address"),
-        row.get("city"),
-        row.get("program"),
-        row.get("enforcement_action"),
-        row.get("enforcement_action_no"),
-        row.get("zip"),
-        county_map.get(row.get("county")),
-        row.get("enforcement_action_issued"),
-        row.get("case_closed"),
-        row.get("media")
-    ))
-conn.commit()
+@profiled
+def prepare_water(water_df):
+    return pd.DataFrame({
+        "ai_combined": water_df["ai_combined"],
+        "upload_id": water_df["upload_id"],
+        "address": water_df["addressinfo"],
+        "city": water_df["city"],
+        "program": water_df["program"],
+        "enforcement_action": water_df["enforcement_action"],
+        "enforcement_number": water_df["enforcement_action_no"],
+        "zip_code": to_int(water_df["zip"]),
+        "county_id": county_ids(water_df["county"], "water_enforcements_in_md"),
+        "enforcement_action_issued": to_date(water_df["enforcement_action_issued"]),
+        "case_closed": to_date(water_df["case_closed"]),
+        "media": water_df["media"],
+        "row_hash": water_df["row_hash"],
+    })
+
 
 # 4. Average wage Maryland table
-wage_maryland = wage_df[["Year", "MARYLAND", "Date created"]].copy()
-wage_maryland.rename(columns={
-    "Year": "year",
-    "MARYLAND": "wage_that_year",
-    "Date created": "date_created"
-}, inplace=True)
-
-for _, row in wage_maryland.iterrows():
-    # Clean numeric wage (remove commas, convert to int safely)
-    wage_value = row["wage_that_year"]
-    if pd.notnull(wage_value):
-        wage_value = int(str(wage_value).replace(",", "").strip())
-    else:
-        wage_value = None
-
-    cur.execute("""
-        INSERT INTO md_data.average_wage_maryland (year, wage_that_year, date_created)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (year) DO NOTHING;
-    """, (row["year"], wage_value, row["date_created"]))
-
-
-
-# 5. Average wage per county table
-
-county_cols = [c for c in wage_df.columns if "County" in c and c != "MARYLAND"]
-
-melted = wage_df.melt(
-    id_vars=["Year"],
-    value_vars=county_cols,
-    var_name="County_Name",
-    value_name="WageForCounty"
-)
-
-# rename columns right after melting
-melted.rename(columns={
-    "Year": "year",
-    "County_Name": "county_name",
-    "WageForCounty": "wage_for_county"
-}, inplace=True)
-
-# clean and insert
-for _, row in melted.iterrows():
-    wage_val = row["wage_for_county"]
-    if pd.notnull(wage_val):
-        wage_val = int(str(wage_val).replace(",", "").strip())
-    else:
-        wage_val = None
-
-    county_id = county_map.get(normalize_county(row["county_name"]))
-    if county_id is None:
-        continue  # skip rows with unmatched counties
-
-    cur.execute("""
-        INSERT INTO md_data.average_wage_per_county (wage_for_county, year, county_id)
-        VALUES (%s, %s, %s)
-        ON CONFLICT DO NOTHING;
-    """, (wage_val, row["year"], county_id))
-
-conn.commit()
-
-# Clean up
-cur.close()
-conn.close()
-print("All CSV data successfully loaded into final_project database.")
\ No newline at end of file
+@profiled
+def prepare_wage_maryland(wage_df):
+    return pd.DataFrame({
+        "year": wage_df["Year"],
+        "wage_that_year": to_int(wage_df["MARYLAND"]),
+        "date_created": to_date(wage_df["Date created"]),
+    })
+
+
+# 5. Average wage per county table, from every county column of the wage file
+@profiled
+def prepare_wage_county(wage_df):
+    county_cols = [c for c in wage_df.columns
+                   if c not in ("Date created", "Year", "MARYLAND")]
+
+    melted = wage_df.melt(
+        id_vars=["Year"],
+        value_vars=county_cols,
+        var_name="County_Name",
+        value_name="WageForCounty"
+    )
+
+    melted = pd.DataFrame({
+        "county_id": county_ids(melted["County_Name"], "average_wage_per_county"),
+        "year": melted["Year"],
+        "wage_for_county": to_int(melted["WageForCounty"]),
+    })
+    # skip rows with unmatched counties or no figure; a county listed
+    # twice keeps its first column, one row per (county_id, year)
+    melted = melted.dropna(subset=["county_id", "wage_for_county"])
+    return melted.drop_duplicates(subset=["county_id", "year"], keep="first")
+
+
+def main():
+    # wall time, rows, bytes and peak memory per stage, written as a JSON
+    # run report to $MD_PROFILE_REPORT or profiles/
+    start_run("final_project")
+    try:
+        run_load()
+    finally:
+        report, report_path = finish_run()
+        print(f"Run report written to {report_path} "
+              f"({report['seconds']:.2f}s, peak RSS {report['peak_rss_mb']} MB)")
+
+
+# The county tables every dataset references, as load jobs
+def county_jobs():
+    return {
+        "counties": (prepare_counties(), ["county_id"]),
+        "county_aliases": (prepare_county_aliases(), ["alias"]),
+    }
+
+
+# The tables one cleaned dataset loads, as load jobs
+def dataset_jobs(name):
+    if name == "md_air_enforcement":
+        air_df = ensure_row_hash(read_clean(name, AIR_COLUMNS))
+        return {"air_enforcements_in_md": (prepare_air(air_df), ["ai_combined"])}
+    if name == "md_water_enforcement":
+        water_df = ensure_row_hash(read_clean(name, WATER_COLUMNS))
+        return {"water_enforcements_in_md": (prepare_water(water_df), ["ai_combined"])}
+    if name == WAGE_DATASET:
+        wage_df = read_clean(name)
+        return {
+            "average_wage_maryland": (prepare_wage_maryland(wage_df), ["year"]),
+            "average_wage_per_county": (prepare_wage_county(wage_df), ["county_id", "year"]),
+        }
+    raise ValueError(f"Unknown dataset: {name}")
+
+
+# Load a set of jobs on a pool of their own and return the stats ready
+# for XCom (touched keys as lists). Used by the per-dataset Airflow tasks.
+def load_jobs(jobs):
+    workers = min(MAX_LOAD_WORKERS, len(jobs))
+    pool = get_pool(max_workers=workers)
+    try:
+        stats = load_tables(pool, jobs, read_table_dependencies(), workers)
+    finally:
+        pool.closeall()
+    return [dict(s, touched=sorted(s["touched"])) for s in stats]
+
+
+# When any load changed data, refresh the summaries for the keys it touched
+# and bump the data version in one transaction, so both become visible
+# together; otherwise only record that a load completed. stats may come
+# from several runs (e.g. XCom, with keys as lists). Returns the new data
+# version, or None when nothing changed.
+def publish_changes(conn, stats):
+    touched = {tuple(k) for s in stats for k in s["touched"]}
+    changed = touched or any(s["inserted"] or s["updated"] or s["deleted"]
+                             for s in stats)
+    try:
+        if changed:
+            if touched:
+                refresh_summaries(conn, touched)
+            version = bump_data_version(conn)
+        else:
+            version = None
+            record_load(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return version
+
+
+def run_load():
+    pool = get_pool()
+    print("Connected to final_project database!")
+
+    # Load cleaned data
+    jobs = county_jobs()
+    for name in DATASETS:
+        jobs.update(dataset_jobs(name))
+
+    start = time.perf_counter()
+    try:
+        stats = load_tables(pool, jobs, read_table_dependencies())
+        conn = pool.getconn()
+        try:
+            publish_changes(conn, stats)
+        finally:
+            pool.putconn(conn)
+    finally:
+        # Clean up
+        pool.closeall()
+    print_load_summary(stats, time.perf_counter() - start)
+    print("All data successfully loaded into final_project database.")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,20 +12,43 @@ CREATE TABLE md_data.counties (
 );
 
 
+-- county name normalization; mirrors normalize_names() in mdcounties.py
+CREATE OR REPLACE FUNCTION md_data.normalize_county_name(name TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT regexp_replace(
+        btrim(regexp_replace(regexp_replace(regexp_replace(
+            lower(name), '[.''’]', '', 'g'),
+            '\msaint\M', 'st', 'g'),
+            '\s+', ' ', 'g')),
+        ' county$', '')
+$$;
+
+
+-- county_aliases (normalized alias -> county, loaded from mdcounties.py)
+DROP TABLE IF EXISTS md_data.county_aliases CASCADE;
+CREATE TABLE md_data.county_aliases (
+    alias VARCHAR(100) PRIMARY KEY,
+    county_id INT NOT NULL,
+    FOREIGN KEY (county_id) REFERENCES md_data.counties(county_id)
+);
+
+
 -- 2. average_wage_maryland
 DROP TABLE IF EXISTS md_data.average_wage_maryland CASCADE;
 CREATE TABLE md_data.average_wage_maryland (
     year INT PRIMARY KEY,
     wage_that_year INT NOT NULL,
-    date_created VARCHAR(50)
+    date_created DATE
 );
 
 -- 3. average_wage_per_county
 DROP TABLE IF EXISTS md_data.average_wage_per_county CASCADE;
 CREATE TABLE md_data.average_wage_per_county (
-    wage_for_county INT PRIMARY KEY,
-    year INT NOT NULL,
     county_id INT NOT NULL,
+    year INT NOT NULL,
+    wage_for_county INT NOT NULL,
+    PRIMARY KEY (county_id, year),
     FOREIGN KEY (year) REFERENCES md_data.average_wage_maryland(year),
     FOREIGN KEY (county_id) REFERENCES md_data.counties(county_id)
 );
@@ -35,16 +58,21 @@ CREATE TABLE md_data.average_wage_per_county (
 DROP TABLE IF EXISTS md_data.air_enforcements_in_md CASCADE;
 CREATE TABLE md_data.air_enforcements_in_md (
     ai_combined VARCHAR(255) PRIMARY KEY,
-    achieved_date VARCHAR(255),
+    achieved_date DATE,
     action_description VARCHAR(255),
     address VARCHAR(255),
     city VARCHAR(50),
     zip_code INT,
     county_id INT,
     documents VARCHAR(255),
+    row_hash CHAR(16),
+    year INT GENERATED ALWAYS AS (EXTRACT(YEAR FROM achieved_date)::int) STORED,
     FOREIGN KEY (county_id) REFERENCES md_data.counties(county_id)
 );
 
+CREATE INDEX air_enforcements_county_year_idx
+    ON md_data.air_enforcements_in_md (county_id, year);
+
 -- 5. water_enforcements_in_md
 DROP TABLE IF EXISTS md_data.water_enforcements_in_md CASCADE;
 CREATE TABLE md_data.water_enforcements_in_md (
@@ -57,8 +85,203 @@ CREATE TABLE md_data.water_enforcements_in_md (
     enforcement_number VARCHAR(255),
     zip_code INT,
     county_id INT,
-    enforcement_action_issued VARCHAR(255),
-    case_closed VARCHAR(255),
+    enforcement_action_issued DATE,
+    case_closed DATE,
     media VARCHAR(255),
+    row_hash CHAR(16),
+    -- water enforcements are counted by the year the case closed
+    year INT GENERATED ALWAYS AS (EXTRACT(YEAR FROM case_closed)::int) STORED,
     FOREIGN KEY (county_id) REFERENCES md_data.counties(county_id)
 );
+
+CREATE INDEX water_enforcements_county_year_idx
+    ON md_data.water_enforcements_in_md (county_id, year);
+
+
+-- 6. overview_agg: wages and enforcement counts per county and year.
+-- Maintained by final_project.py, which refreshes only the keys touched
+-- by each load, so API readers are never blocked by a full rebuild.
+DROP TABLE IF EXISTS md_data.overview_agg CASCADE;
+CREATE TABLE md_data.overview_agg (
+    county_id INT NOT NULL,
+    year INT NOT NULL,
+    total_enforcements INT NOT NULL DEFAULT 0,
+    average_wage FLOAT,
+    PRIMARY KEY (county_id, year)
+);
+
+
+-- Recompute overview_agg for the given (county_id, year) pairs, passed
+-- as two parallel arrays; with no arguments every key is recomputed.
+-- Returns the number of overview rows inserted, updated or deleted.
+CREATE OR REPLACE FUNCTION md_data.refresh_overview_agg(
+    county_ids INT[] DEFAULT NULL,
+    years INT[] DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed INT;
+BEGIN
+    WITH keys AS (
+        SELECT DISTINCT k.county_id, k.year
+        FROM unnest(county_ids, years) AS k(county_id, year)
+    ),
+    enforcement_counts AS (
+        SELECT e.county_id, e.year, COUNT(*)::int AS total_enforcements
+        FROM (
+            SELECT county_id, year FROM md_data.air_enforcements_in_md
+            UNION ALL
+            SELECT county_id, year FROM md_data.water_enforcements_in_md
+        ) e
+        WHERE e.county_id IS NOT NULL AND e.year IS NOT NULL
+          AND (county_ids IS NULL
+               OR (e.county_id, e.year) IN (SELECT county_id, year FROM keys))
+        GROUP BY e.county_id, e.year
+    ),
+    wages AS (
+        SELECT w.county_id, w.year, w.wage_for_county::float AS average_wage
+        FROM md_data.average_wage_per_county w
+        WHERE county_ids IS NULL
+           OR (w.county_id, w.year) IN (SELECT county_id, year FROM keys)
+    ),
+    fresh AS (
+        SELECT
+            COALESCE(w.county_id, e.county_id) AS county_id,
+            COALESCE(w.year, e.year) AS year,
+            COALESCE(e.total_enforcements, 0) AS total_enforcements,
+            w.average_wage
+        FROM wages w
+        FULL OUTER JOIN enforcement_counts e
+            ON e.county_id = w.county_id AND e.year = w.year
+    ),
+    removed AS (
+        DELETE FROM md_data.overview_agg o
+        WHERE (county_ids IS NULL
+               OR (o.county_id, o.year) IN (SELECT county_id, year FROM keys))
+          AND NOT EXISTS (SELECT 1 FROM fresh f
+                          WHERE f.county_id = o.county_id AND f.year = o.year)
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO md_data.overview_agg AS o
+            (county_id, year, total_enforcements, average_wage)
+        SELECT county_id, year, total_enforcements, average_wage FROM fresh
+        ON CONFLICT (county_id, year) DO UPDATE SET
+            total_enforcements = EXCLUDED.total_enforcements,
+            average_wage = EXCLUDED.average_wage
+        WHERE ROW(o.total_enforcements, o.average_wage)
+              IS DISTINCT FROM ROW(EXCLUDED.total_enforcements, EXCLUDED.average_wage)
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM removed) + (SELECT COUNT(*) FROM upserted)
+    INTO changed;
+    RETURN changed;
+END;
+$$;
+
+
+-- 7. enforcement_rollup: enforcement counts per county, year, source and
+-- category (the media for water, '' for air), refreshed with overview_agg
+DROP TABLE IF EXISTS md_data.enforcement_rollup CASCADE;
+CREATE TABLE md_data.enforcement_rollup (
+    county_id INT NOT NULL,
+    year INT NOT NULL,
+    source VARCHAR(10) NOT NULL,
+    category VARCHAR(255) NOT NULL DEFAULT '',
+    total_enforcements INT NOT NULL,
+    PRIMARY KEY (county_id, year, source, category)
+);
+
+
+-- Recompute enforcement_rollup for the given (county_id, year) pairs,
+-- like refresh_overview_agg; with no arguments every key is recomputed.
+-- Returns the number of rollup rows inserted, updated or deleted.
+CREATE OR REPLACE FUNCTION md_data.refresh_enforcement_rollup(
+    county_ids INT[] DEFAULT NULL,
+    years INT[] DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed INT;
+BEGIN
+    WITH keys AS (
+        SELECT DISTINCT k.county_id, k.year
+        FROM unnest(county_ids, years) AS k(county_id, year)
+    ),
+    fresh AS (
+        SELECT e.county_id, e.year, e.source, e.category,
+               COUNT(*)::int AS total_enforcements
+        FROM (
+            SELECT county_id, year, 'air' AS source, '' AS category
+            FROM md_data.air_enforcements_in_md
+            UNION ALL
+            SELECT county_id, year, 'water', COALESCE(media, '')
+            FROM md_data.water_enforcements_in_md
+        ) e
+        WHERE e.county_id IS NOT NULL AND e.year IS NOT NULL
+          AND (county_ids IS NULL
+               OR (e.county_id, e.year) IN (SELECT county_id, year FROM keys))
+        GROUP BY e.county_id, e.year, e.source, e.category
+    ),
+    removed AS (
+        DELETE FROM md_data.enforcement_rollup r
+        WHERE (county_ids IS NULL
+               OR (r.county_id, r.year) IN (SELECT county_id, year FROM keys))
+          AND NOT EXISTS (SELECT 1 FROM fresh f
+                          WHERE f.county_id = r.county_id AND f.year = r.year
+                            AND f.source = r.source AND f.category = r.category)
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO md_data.enforcement_rollup AS r
+            (county_id, year, source, category, total_enforcements)
+        SELECT county_id, year, source, category, total_enforcements FROM fresh
+        ON CONFLICT (county_id, year, source, category) DO UPDATE SET
+            total_enforcements = EXCLUDED.total_enforcements
+        WHERE r.total_enforcements <> EXCLUDED.total_enforcements
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM removed) + (SELECT COUNT(*) FROM upserted)
+    INTO changed;
+    RETURN changed;
+END;
+$$;
+
+
+-- 8. data_version: a single row bumped by final_project.py whenever a load
+-- changes data. The API keys its response cache and ETags on it.
+-- updated_at is when data (and the summaries) last changed, loaded_at when
+-- a load last completed, changed or not; /health reports both ages.
+DROP TABLE IF EXISTS md_data.data_version CASCADE;
+CREATE TABLE md_data.data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+
+-- Advance the data version and return it. Versions start from the clock in
+-- milliseconds so they keep increasing if the table is ever recreated.
+CREATE OR REPLACE FUNCTION md_data.bump_data_version()
+RETURNS BIGINT
+LANGUAGE sql AS $$
+    INSERT INTO md_data.data_version AS d (id, version)
+    VALUES (TRUE, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::bigint)
+    ON CONFLICT (id) DO UPDATE SET
+        version = GREATEST(d.version + 1, EXCLUDED.version),
+        updated_at = now(),
+        loaded_at = now()
+    RETURNING version
+$$;
+
+-- Mark a load that changed nothing as completed, leaving the version as is
+CREATE OR REPLACE FUNCTION md_data.record_load()
+RETURNS TIMESTAMPTZ
+LANGUAGE sql AS $$
+    UPDATE md_data.data_version SET loaded_at = now() RETURNING loaded_at
+$$;
+
+SELECT md_data.bump_data_version();
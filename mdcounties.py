@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module contains the county dimension shared by the loader
+and the API: the Maryland jurisdictions with fixed ids, an alias
+index built once at import, and vectorized resolution of whole
+columns of county names to county ids.
+"""
+
+import pandas as pd
+
+# (county_id, county_name, state). Ids are fixed so they stay the
+# same between loads.
+COUNTIES = [
+    (1, "Allegany", "MD"),
+    (2, "Anne Arundel", "MD"),
+    (3, "Baltimore City", "MD"),
+    (4, "Baltimore County", "MD"),
+    (5, "Calvert", "MD"),
+    (6, "Caroline", "MD"),
+    (7, "Carroll", "MD"),
+    (8, "Cecil", "MD"),
+    (9, "Charles", "MD"),
+    (10, "Dorchester", "MD"),
+    (11, "Frederick", "MD"),
+    (12, "Garrett", "MD"),
+    (13, "Harford", "MD"),
+    (14, "Howard", "MD"),
+    (15, "Kent", "MD"),
+    (16, "Montgomery", "MD"),
+    (17, "Prince George's", "MD"),
+    (18, "Queen Anne's", "MD"),
+    (19, "St. Mary's", "MD"),
+    (20, "Somerset", "MD"),
+    (21, "Talbot", "MD"),
+    (22, "Washington", "MD"),
+    (23, "Wicomico", "MD"),
+    (24, "Worcester", "MD"),
+    (25, "Statewide", "MD"),
+    (26, "Outside of Maryland", "N/A"),
+]
+
+# Spellings that do not normalize to a county name on their own.
+# "Baltimore" (as the enforcement data spells Baltimore County) needs
+# no entry: "Baltimore County" normalizes to it, while "Baltimore
+# City" keeps its suffix and stays distinct.
+EXTRA_ALIASES = {
+    "baltimore co": 4,
+    "city of baltimore": 3,
+    "out of state": 26,
+}
+
+def normalize_names(names):
+    """
+    Normalizes a Series of county names for matching: lowercase,
+    no periods or apostrophes, "saint" as "st", single spaces and
+    no trailing "county". Mirrors md_data.normalize_county_name
+    in final_project_db.sql.
+    """
+    return (names.astype("string")
+            .str.lower()
+            .str.replace(r"[.'’]", "", regex=True)
+            .str.replace(r"\bsaint\b", "st", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip()
+            .str.replace(r" county$", "", regex=True)
+            )
+
+def build_alias_index():
+    """
+    Returns a dict mapping each normalized alias to its county_id.
+    """
+    names = pd.Series([name for _, name, _ in COUNTIES])
+    index = dict(zip(normalize_names(names), [cid for cid, _, _ in COUNTIES]))
+    index.update(EXTRA_ALIASES)
+    return index
+
+ALIAS_INDEX = build_alias_index()
+
+def county_dimension():
+    """Returns the counties table as a DataFrame."""
+    return pd.DataFrame(COUNTIES, columns=["county_id", "county_name", "state"])
+
+def alias_table():
+    """Returns the alias index as a DataFrame (alias, county_id)."""
+    return pd.DataFrame(sorted(ALIAS_INDEX.items()),
+                        columns=["alias", "county_id"])
+
+def resolve_counties(names, alias_index=ALIAS_INDEX):
+    """
+    Resolves a Series of county names to nullable Int64 county ids
+    in one vectorized pass over the distinct names. Returns the ids
+    and a sorted list of the non-null names that did not match.
+    """
+    codes, uniques = pd.factorize(names)
+    unique_ids = (normalize_names(pd.Series(uniques, dtype=object))
+                  .map(alias_index)
+                  .astype("Int64")
+                  )
+    ids = pd.Series(unique_ids.array.take(codes, allow_fill=True),
+                    index=names.index)
+    unmatched = sorted(str(u) for u, i in zip(uniques, unique_ids) if pd.isna(i))
+    return ids, unmatched
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module contains a small on-disk HTTP response cache
+used by fetchdata.py to make conditional requests, so that
+unchanged Maryland API data is not downloaded again.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+CURRENT_DIR = os.getcwd()
+CACHE_DIR = os.path.join(CURRENT_DIR, "state", "http_cache")
+
+# Eviction policy: entries unused for longer than CACHE_MAX_AGE
+# seconds are dropped, then the least recently used entries until
+# the cache fits in CACHE_MAX_BYTES.
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+def cache_key(url, params=None):
+    """
+    Builds a stable key from a URL and its query parameters.
+    """
+    query = json.dumps(sorted((params or {}).items()), default=str)
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+def read_entry(cache_dir, key):
+    """
+    Returns the stored metadata for a key, or None.
+    """
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+    body_path = os.path.join(cache_dir, f"{key}.body")
+    if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+def write_entry(cache_dir, key, meta, body=None):
+    """
+    Writes the metadata, and optionally the body, for a key.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    if body is not None:
+        with open(os.path.join(cache_dir, f"{key}.body"), "wb") as f:
+            f.write(body)
+    with open(os.path.join(cache_dir, f"{key}.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+def cached_get(session, url, params=None, cache_dir=CACHE_DIR,
+               timeout=None):
+    """
+    Sends a GET with If-None-Match / If-Modified-Since validators
+    from the cache. Returns (body, not_modified), where body is the
+    cached body on a 304 and the fresh body otherwise.
+    """
+    key = cache_key(url, params)
+    entry = read_entry(cache_dir, key)
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(url,
+                           params=params,
+                           headers=headers,
+                           timeout=timeout)
+
+    if response.status_code == 304 and entry:
+        entry["used_at"] = time.time()
+        write_entry(cache_dir, key, entry)
+        with open(os.path.join(cache_dir, f"{key}.body"), "rb") as f:
+            return f.read(), True
+
+    response.raise_for_status()
+    body = response.content
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+
+    # only responses carrying a validator are worth keeping
+    if etag or last_modified:
+        now = time.time()
+        write_entry(cache_dir,
+                    key,
+                    {"url": url,
+                     "params": params,
+                     "etag": etag,
+                     "last_modified": last_modified,
+                     "size": len(body),
+                     "stored_at": now,
+                     "used_at": now,
+                     },
+                    body)
+        evict_cache(cache_dir)
+
+    return body, False
+
+def evict_cache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES,
+                max_age=CACHE_MAX_AGE):
+    """
+    Removes entries unused for more than max_age seconds, then the
+    least recently used entries until the cache fits in max_bytes.
+    Returns the number of entries removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for file_name in os.listdir(cache_dir):
+        if file_name.endswith(".json"):
+            key = file_name[:-len(".json")]
+            meta = read_entry(cache_dir, key)
+            if meta:
+                entries.append((meta.get("used_at", 0),
+                                meta.get("size", 0),
+                                key))
+
+    # oldest first
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age
+    removed = 0
+    for used_at, size, key in entries:
+        if used_at >= cutoff and total <= max_bytes:
+            break
+        for ext in (".json", ".body"):
+            path = os.path.join(cache_dir, f"{key}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+        total -= size
+        removed += 1
+
+    return removed
@@ -2,15 +2,30 @@
 # -*- coding: utf-8 -*-
 """
 This module contains utility functions for processing
-Maryland environmental data.
+Maryland environmental data. Calls are timed into the
+active mdprofiling run, if any.
 """
 
 import pandas as pd
 import os
+import re
+from mdprofiling import profiled
 
 CURRENT_DIR = os.getcwd()
 raw_data_path = os.path.join(CURRENT_DIR,'raw_data')
 
+# "city,state,zip" as served by the Maryland API, e.g.
+# "Brandywine,MD,20613-8200". Only the first five digits of
+# the zip are kept, and state and zip may be missing. The
+# state is the whole stripped field, so "Maryland" stays
+# "Maryland" rather than being cut to two letters.
+CITY_STATE_ZIP_PATTERN = re.compile(
+    r"^\s*(?P<city>[^,]*?)\s*"
+    r"(?:,\s*(?P<state>[^,\s](?:[^,]*[^,\s])?)?\s*)?"
+    r"(?:,\s*(?P<zip>\d{5})?.*)?$"
+)
+
+@profiled
 def get_all_file_paths(directory):
     """
     Retrieves a list of all absolute file paths within 
@@ -23,6 +38,7 @@ def get_all_file_paths(directory):
             file_paths.append(full_path)
     return file_paths
 
+@profiled
 def null_value_report(df):
     """
     Generates a report of null values in each column of 
@@ -31,6 +47,7 @@ def null_value_report(df):
     null_report = df.isnull().sum()
     return null_report
 
+@profiled
 def string_split_column(df,column_name,delimiter):
     """
     Splits the specified string column into multiple columns
@@ -43,6 +60,7 @@ def string_split_column(df,column_name,delimiter):
 
     return df
 
+@profiled
 def rename_split_columns(df,base_col_name='city_state_zip'):
     """
     Renames columns generated from 
@@ -59,6 +77,7 @@ def rename_split_columns(df,base_col_name='city_state_zip'):
 
     return df
 
+@profiled
 def combine_2_cols(df,col1,col2,new_col_name,separator=' '):
     """
     Combines two specified columns into a new column
@@ -74,4 +93,59 @@ def combine_2_cols(df,col1,col2,new_col_name,separator=' '):
     # dropping the original columns (optional)
     df.drop(columns=[col1, col2],inplace=True)
 
-    return df
\ No newline at end of file
+    return df
+
+@profiled
+def parse_city_state_zip(df,column_name='city_state_zip'):
+    """
+    Parses a "city,state,zip" column into city and state
+    (categoricals) and a 5-digit zip (nullable Int32), then drops
+    the original column. Replaces string_split_column,
+    rename_split_columns and the separate zip cleanup passes.
+
+    Addresses repeat heavily, so the column is factorized first and
+    the compiled pattern is matched once per distinct value; the
+    results are then expanded back to rows by code.
+    """
+    codes, uniques = pd.factorize(df[column_name])
+    matches = [CITY_STATE_ZIP_PATTERN.match(str(value)) for value in uniques]
+    parts = pd.DataFrame([m.groups() if m else (None, None, None)
+                          for m in matches],
+                         columns=['city', 'state', 'zip'],
+                         dtype=object)
+
+    df['city'] = pd.Categorical(parts['city']).take(codes, allow_fill=True)
+    df['state'] = pd.Categorical(parts['state']).take(codes, allow_fill=True)
+    df['zip'] = (pd.to_numeric(parts['zip'])
+                 .astype('Int32')
+                 .array
+                 .take(codes, allow_fill=True)
+                 )
+    df.drop(columns=[column_name], inplace=True)
+
+    return df
+
+@profiled
+def combine_key_cols(df,col1,col2,new_col_name,separator=' '):
+    """
+    Combines two columns into a key column with one vectorized
+    string concatenation, then drops the original columns.
+    Missing values render exactly as in combine_2_cols, as the
+    result is the ai_combined primary key of rows already loaded.
+    """
+    df[new_col_name] = df[col1].astype(str).str.cat(df[col2].astype(str),
+                                                    sep=separator)
+    df.drop(columns=[col1, col2],inplace=True)
+
+    return df
+
+@profiled
+def hash_rows(df):
+    """
+    Returns a 16 character hex content hash per row. Rows are
+    hashed in their string form, so the hash does not depend on
+    the dtypes a batch happened to be read with.
+    """
+    canonical = df.astype('string').fillna('')
+    hashes = pd.util.hash_pandas_object(canonical, index=False)
+    return hashes.map('{:016x}'.format)
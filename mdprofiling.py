@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module records a stage-level profile of a pipeline run:
+wall time, rows in and out, bytes read and written and the
+change in resident memory per stage, plus call counts and time per
+mdprocessingutils function, written as one JSON run report.
+
+Only one run is active per process. Stages and profiled
+functions outside an active run cost a single check, so the
+instrumentation can stay in place permanently.
+"""
+
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # peak RSS is not reported on Windows
+    resource = None
+
+CURRENT_DIR = os.getcwd()
+PROFILE_DIR = os.path.join(CURRENT_DIR, "profiles")
+
+# Airflow tasks set this to a known path so they can push the
+# report to XCom; otherwise reports go to PROFILE_DIR
+REPORT_PATH_ENV = "MD_PROFILE_REPORT"
+
+_active = None
+
+def io_counters():
+    """
+    Returns (bytes read, bytes written) by this process so far,
+    counting files and sockets alike, or (None, None) where
+    /proc/self/io is unavailable.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def peak_rss_mb(who="self"):
+    """
+    Returns the peak resident set size in MB of this process
+    ("self") or of its finished worker processes ("children").
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self"
+                               else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+def current_rss_mb():
+    """
+    Returns the current resident set size in MB of this process,
+    or None where /proc/self/status is unavailable.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def count_rows(obj):
+    """Returns the row count of a DataFrame or Series, else None."""
+    if hasattr(obj, "shape") and hasattr(obj, "index"):
+        return len(obj)
+    return None
+
+class RunProfile:
+    """
+    Collects stages and function calls of one run. Stages may
+    be recorded from several threads; their byte counts and
+    memory are process-wide and so overlap when stages run
+    concurrently.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = []
+        self.functions = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Times the body as one stage. The yielded dict can be given
+        rows_out and any other counts worth keeping. Resident
+        memory is recorded at the start and end of the stage, with
+        the peak of the whole process so far alongside, since that
+        peak stays at its highest stage for every later one.
+        """
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        read_before, written_before = io_counters()
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            read_after, written_after = io_counters()
+            if read_before is not None and read_after is not None:
+                record["bytes_read"] = read_after - read_before
+                record["bytes_written"] = written_after - written_before
+            rss_after = current_rss_mb()
+            record["rss_start_mb"] = rss_before
+            record["rss_end_mb"] = rss_after
+            if rss_before is not None and rss_after is not None:
+                record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            record["process_peak_rss_mb"] = peak_rss_mb()
+            with self._lock:
+                self.stages.append(record)
+
+    def record_call(self, name, seconds, rows_in=None, rows_out=None):
+        """Adds one call of a profiled function to its totals."""
+        with self._lock:
+            totals = self.functions.setdefault(
+                name, {"calls": 0, "seconds": 0.0,
+                       "rows_in": 0, "rows_out": 0})
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["rows_in"] += rows_in or 0
+            totals["rows_out"] += rows_out or 0
+
+    def merge(self, report):
+        """
+        Adds the stages and function totals of a report made in a
+        worker process, e.g. one returned by transform_file.
+        """
+        with self._lock:
+            self.stages.extend(report.get("stages", []))
+            for name, other in report.get("functions", {}).items():
+                totals = self.functions.setdefault(
+                    name, {"calls": 0, "seconds": 0.0,
+                           "rows_in": 0, "rows_out": 0})
+                for key, value in other.items():
+                    totals[key] += value
+
+    def report(self):
+        """Returns the run report as a JSON-serializable dict."""
+        with self._lock:
+            stages = list(self.stages)
+            functions = {name: dict(totals, seconds=round(totals["seconds"], 6))
+                         for name, totals in self.functions.items()}
+        return {"run": self.name,
+                "started_at": self.started_at.isoformat(),
+                "seconds": round(time.perf_counter() - self._start, 6),
+                "host": platform.node(),
+                "python": platform.python_version(),
+                "pid": os.getpid(),
+                "peak_rss_mb": peak_rss_mb(),
+                "children_peak_rss_mb": peak_rss_mb("children"),
+                "stages": stages,
+                "functions": functions,
+                }
+
+def default_report_path(name, started_at=None):
+    """
+    Returns the report path for a run: $MD_PROFILE_REPORT when
+    set, else profiles/<name>_<UTC start time>.json.
+    """
+    if os.environ.get(REPORT_PATH_ENV):
+        return os.environ[REPORT_PATH_ENV]
+    started_at = started_at or datetime.now(timezone.utc)
+    return os.path.join(PROFILE_DIR,
+                        f"{name}_{started_at:%Y%m%dT%H%M%SZ}.json")
+
+def start_run(name):
+    """Starts and returns the active run of this process."""
+    global _active
+    _active = RunProfile(name)
+    return _active
+
+def current_run():
+    """Returns the active run, or None outside a run."""
+    return _active
+
+def stop_run():
+    """Ends the active run and returns it without writing a report."""
+    global _active
+    profile, _active = _active, None
+    return profile
+
+def finish_run(path=None):
+    """
+    Ends the active run, writes its report as JSON (to path, or
+    default_report_path) and returns (report, path).
+    """
+    profile = stop_run()
+    if profile is None:
+        return None, None
+    report = profile.report()
+    path = path or default_report_path(profile.name, profile.started_at)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    return report, path
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Records the body as a stage of the active run; outside a run
+    it only yields a scratch dict.
+    """
+    profile = _active
+    if profile is None:
+        yield {}
+        return
+    with profile.stage(name, rows_in) as record:
+        yield record
+
+def profiled(func):
+    """
+    Decorator adding each call of func to the active run: wall
+    time, rows of the first argument and rows of the result when
+    they are DataFrames or Series.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _active
+        if profile is None:
+            return func(*args, **kwargs)
+        rows_in = count_rows(args[0]) if args else None
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        profile.record_call(func.__name__,
+                            time.perf_counter() - start,
+                            rows_in,
+                            count_rows(result))
+        return result
+    return wrapper
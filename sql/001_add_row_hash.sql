@@ -0,0 +1,10 @@
+-- Adds the row content hash used by final_project.py to skip unchanged
+-- enforcement rows and update corrected ones.
+-- Run against an existing final_project database:
+--   psql -U jhu -d final_project -f sql/001_add_row_hash.sql
+
+ALTER TABLE md_data.air_enforcements_in_md
+    ADD COLUMN IF NOT EXISTS row_hash CHAR(16);
+
+ALTER TABLE md_data.water_enforcements_in_md
+    ADD COLUMN IF NOT EXISTS row_hash CHAR(16);
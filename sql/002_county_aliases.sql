@@ -0,0 +1,25 @@
+-- Adds the shared county alias index and name normalization function.
+-- County ids are fixed by mdcounties.py from this version on, so rerun
+-- final_project.py afterwards: counties are upserted to the fixed ids,
+-- enforcement rows whose county resolves differently are updated, wage
+-- rows left under an old county id are deleted, and the summaries for
+-- those keys are refreshed.
+-- Run against an existing final_project database:
+--   psql -U jhu -d final_project -f sql/002_county_aliases.sql
+
+CREATE OR REPLACE FUNCTION md_data.normalize_county_name(name TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT regexp_replace(
+        btrim(regexp_replace(regexp_replace(regexp_replace(
+            lower(name), '[.''’]', '', 'g'),
+            '\msaint\M', 'st', 'g'),
+            '\s+', ' ', 'g')),
+        ' county$', '')
+$$;
+
+CREATE TABLE IF NOT EXISTS md_data.county_aliases (
+    alias VARCHAR(100) PRIMARY KEY,
+    county_id INT NOT NULL,
+    FOREIGN KEY (county_id) REFERENCES md_data.counties(county_id)
+);
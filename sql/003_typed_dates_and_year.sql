@@ -0,0 +1,64 @@
+-- Stores enforcement and wage dates as DATE, adds stored generated year
+-- columns with (county_id, year) indexes, and keys average_wage_per_county
+-- on (county_id, year) instead of wage_for_county.
+-- Existing text dates are converted in place (ISO "2021-02-04T00:00:00.000"
+-- and "10/06/2025" style); values that are not dates become NULL.
+-- Views over these columns must be dropped first and recreated afterwards;
+-- mv_overview_agg is dropped here so the pipeline_api_and_refresh DAG
+-- recreates it on the year columns.
+-- Run against an existing final_project database:
+--   psql -U jhu -d final_project -f sql/003_typed_dates_and_year.sql
+
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS public.mv_overview_agg;
+
+-- 1. air_enforcements_in_md
+ALTER TABLE md_data.air_enforcements_in_md
+    ALTER COLUMN achieved_date TYPE DATE
+    USING substring(achieved_date::text FROM '^[0-9]{4}-[0-9]{2}-[0-9]{2}')::date;
+
+ALTER TABLE md_data.air_enforcements_in_md
+    ADD COLUMN IF NOT EXISTS year INT
+    GENERATED ALWAYS AS (EXTRACT(YEAR FROM achieved_date)::int) STORED;
+
+CREATE INDEX IF NOT EXISTS air_enforcements_county_year_idx
+    ON md_data.air_enforcements_in_md (county_id, year);
+
+-- 2. water_enforcements_in_md
+ALTER TABLE md_data.water_enforcements_in_md
+    ALTER COLUMN enforcement_action_issued TYPE DATE
+    USING substring(enforcement_action_issued::text FROM '^[0-9]{4}-[0-9]{2}-[0-9]{2}')::date,
+    ALTER COLUMN case_closed TYPE DATE
+    USING substring(case_closed::text FROM '^[0-9]{4}-[0-9]{2}-[0-9]{2}')::date;
+
+ALTER TABLE md_data.water_enforcements_in_md
+    ADD COLUMN IF NOT EXISTS year INT
+    GENERATED ALWAYS AS (EXTRACT(YEAR FROM case_closed)::int) STORED;
+
+CREATE INDEX IF NOT EXISTS water_enforcements_county_year_idx
+    ON md_data.water_enforcements_in_md (county_id, year);
+
+-- 3. average_wage_maryland
+ALTER TABLE md_data.average_wage_maryland
+    ALTER COLUMN date_created TYPE DATE
+    USING CASE
+        WHEN date_created::text ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$'
+            THEN to_date(date_created::text, 'MM/DD/YYYY')
+        ELSE substring(date_created::text FROM '^[0-9]{4}-[0-9]{2}-[0-9]{2}')::date
+    END;
+
+-- 4. average_wage_per_county: one row per county and year
+DELETE FROM md_data.average_wage_per_county a
+USING md_data.average_wage_per_county b
+WHERE a.county_id = b.county_id
+  AND a.year = b.year
+  AND a.ctid > b.ctid;
+
+ALTER TABLE md_data.average_wage_per_county
+    DROP CONSTRAINT IF EXISTS average_wage_per_county_pkey;
+
+ALTER TABLE md_data.average_wage_per_county
+    ADD PRIMARY KEY (county_id, year);
+
+COMMIT;
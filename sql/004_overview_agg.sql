@@ -0,0 +1,90 @@
+-- Adds the overview summary table that replaces mv_overview_agg, and the
+-- function final_project.py calls to refresh only the (county_id, year)
+-- keys a load changed. The table is filled once here.
+-- Run against an existing final_project database after 003:
+--   psql -U jhu -d final_project -f sql/004_overview_agg.sql
+
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS public.mv_overview_agg;
+
+CREATE TABLE IF NOT EXISTS md_data.overview_agg (
+    county_id INT NOT NULL,
+    year INT NOT NULL,
+    total_enforcements INT NOT NULL DEFAULT 0,
+    average_wage FLOAT,
+    PRIMARY KEY (county_id, year)
+);
+
+-- Recompute overview_agg for the given (county_id, year) pairs, passed
+-- as two parallel arrays; with no arguments every key is recomputed.
+-- Returns the number of overview rows inserted, updated or deleted.
+CREATE OR REPLACE FUNCTION md_data.refresh_overview_agg(
+    county_ids INT[] DEFAULT NULL,
+    years INT[] DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed INT;
+BEGIN
+    WITH keys AS (
+        SELECT DISTINCT k.county_id, k.year
+        FROM unnest(county_ids, years) AS k(county_id, year)
+    ),
+    enforcement_counts AS (
+        SELECT e.county_id, e.year, COUNT(*)::int AS total_enforcements
+        FROM (
+            SELECT county_id, year FROM md_data.air_enforcements_in_md
+            UNION ALL
+            SELECT county_id, year FROM md_data.water_enforcements_in_md
+        ) e
+        WHERE e.county_id IS NOT NULL AND e.year IS NOT NULL
+          AND (county_ids IS NULL
+               OR (e.county_id, e.year) IN (SELECT county_id, year FROM keys))
+        GROUP BY e.county_id, e.year
+    ),
+    wages AS (
+        SELECT w.county_id, w.year, w.wage_for_county::float AS average_wage
+        FROM md_data.average_wage_per_county w
+        WHERE county_ids IS NULL
+           OR (w.county_id, w.year) IN (SELECT county_id, year FROM keys)
+    ),
+    fresh AS (
+        SELECT
+            COALESCE(w.county_id, e.county_id) AS county_id,
+            COALESCE(w.year, e.year) AS year,
+            COALESCE(e.total_enforcements, 0) AS total_enforcements,
+            w.average_wage
+        FROM wages w
+        FULL OUTER JOIN enforcement_counts e
+            ON e.county_id = w.county_id AND e.year = w.year
+    ),
+    removed AS (
+        DELETE FROM md_data.overview_agg o
+        WHERE (county_ids IS NULL
+               OR (o.county_id, o.year) IN (SELECT county_id, year FROM keys))
+          AND NOT EXISTS (SELECT 1 FROM fresh f
+                          WHERE f.county_id = o.county_id AND f.year = o.year)
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO md_data.overview_agg AS o
+            (county_id, year, total_enforcements, average_wage)
+        SELECT county_id, year, total_enforcements, average_wage FROM fresh
+        ON CONFLICT (county_id, year) DO UPDATE SET
+            total_enforcements = EXCLUDED.total_enforcements,
+            average_wage = EXCLUDED.average_wage
+        WHERE ROW(o.total_enforcements, o.average_wage)
+              IS DISTINCT FROM ROW(EXCLUDED.total_enforcements, EXCLUDED.average_wage)
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM removed) + (SELECT COUNT(*) FROM upserted)
+    INTO changed;
+    RETURN changed;
+END;
+$$;
+
+SELECT md_data.refresh_overview_agg();
+
+COMMIT;
@@ -0,0 +1,75 @@
+-- Adds the enforcement rollup served by /enforcements, and the function
+-- final_project.py calls to refresh only the (county_id, year) keys a load
+-- changed. The table is filled once here.
+-- Run against an existing final_project database after 004:
+--   psql -U jhu -d final_project -f sql/005_enforcement_rollup.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS md_data.enforcement_rollup (
+    county_id INT NOT NULL,
+    year INT NOT NULL,
+    source VARCHAR(10) NOT NULL,
+    category VARCHAR(255) NOT NULL DEFAULT '',
+    total_enforcements INT NOT NULL,
+    PRIMARY KEY (county_id, year, source, category)
+);
+
+-- Recompute enforcement_rollup for the given (county_id, year) pairs,
+-- like refresh_overview_agg; with no arguments every key is recomputed.
+-- Returns the number of rollup rows inserted, updated or deleted.
+CREATE OR REPLACE FUNCTION md_data.refresh_enforcement_rollup(
+    county_ids INT[] DEFAULT NULL,
+    years INT[] DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed INT;
+BEGIN
+    WITH keys AS (
+        SELECT DISTINCT k.county_id, k.year
+        FROM unnest(county_ids, years) AS k(county_id, year)
+    ),
+    fresh AS (
+        SELECT e.county_id, e.year, e.source, e.category,
+               COUNT(*)::int AS total_enforcements
+        FROM (
+            SELECT county_id, year, 'air' AS source, '' AS category
+            FROM md_data.air_enforcements_in_md
+            UNION ALL
+            SELECT county_id, year, 'water', COALESCE(media, '')
+            FROM md_data.water_enforcements_in_md
+        ) e
+        WHERE e.county_id IS NOT NULL AND e.year IS NOT NULL
+          AND (county_ids IS NULL
+               OR (e.county_id, e.year) IN (SELECT county_id, year FROM keys))
+        GROUP BY e.county_id, e.year, e.source, e.category
+    ),
+    removed AS (
+        DELETE FROM md_data.enforcement_rollup r
+        WHERE (county_ids IS NULL
+               OR (r.county_id, r.year) IN (SELECT county_id, year FROM keys))
+          AND NOT EXISTS (SELECT 1 FROM fresh f
+                          WHERE f.county_id = r.county_id AND f.year = r.year
+                            AND f.source = r.source AND f.category = r.category)
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO md_data.enforcement_rollup AS r
+            (county_id, year, source, category, total_enforcements)
+        SELECT county_id, year, source, category, total_enforcements FROM fresh
+        ON CONFLICT (county_id, year, source, category) DO UPDATE SET
+            total_enforcements = EXCLUDED.total_enforcements
+        WHERE r.total_enforcements <> EXCLUDED.total_enforcements
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM removed) + (SELECT COUNT(*) FROM upserted)
+    INTO changed;
+    RETURN changed;
+END;
+$$;
+
+SELECT md_data.refresh_enforcement_rollup();
+
+COMMIT;
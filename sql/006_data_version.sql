@@ -0,0 +1,29 @@
+-- Adds the data version marker the API response cache and ETags are keyed
+-- on; final_project.py bumps it after each load that changes data.
+-- Run against an existing final_project database:
+--   psql -U jhu -d final_project -f sql/006_data_version.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS md_data.data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Advance the data version and return it. Versions start from the clock in
+-- milliseconds so they keep increasing if the table is ever recreated.
+CREATE OR REPLACE FUNCTION md_data.bump_data_version()
+RETURNS BIGINT
+LANGUAGE sql AS $$
+    INSERT INTO md_data.data_version AS d (id, version)
+    VALUES (TRUE, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::bigint)
+    ON CONFLICT (id) DO UPDATE SET
+        version = GREATEST(d.version + 1, EXCLUDED.version),
+        updated_at = now()
+    RETURNING version
+$$;
+
+SELECT md_data.bump_data_version();
+
+COMMIT;
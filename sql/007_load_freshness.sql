@@ -0,0 +1,33 @@
+-- Adds data_version.loaded_at, when a load last completed whether or not it
+-- changed data, so /health can report how stale the last load is next to
+-- updated_at (when data and the summaries last changed).
+-- Run against an existing final_project database after 006:
+--   psql -U jhu -d final_project -f sql/007_load_freshness.sql
+
+BEGIN;
+
+ALTER TABLE md_data.data_version
+    ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+UPDATE md_data.data_version SET loaded_at = updated_at;
+
+CREATE OR REPLACE FUNCTION md_data.bump_data_version()
+RETURNS BIGINT
+LANGUAGE sql AS $$
+    INSERT INTO md_data.data_version AS d (id, version)
+    VALUES (TRUE, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::bigint)
+    ON CONFLICT (id) DO UPDATE SET
+        version = GREATEST(d.version + 1, EXCLUDED.version),
+        updated_at = now(),
+        loaded_at = now()
+    RETURNING version
+$$;
+
+-- Mark a load that changed nothing as completed, leaving the version as is
+CREATE OR REPLACE FUNCTION md_data.record_load()
+RETURNS TIMESTAMPTZ
+LANGUAGE sql AS $$
+    UPDATE md_data.data_version SET loaded_at = now() RETURNING loaded_at
+$$;
+
+COMMIT;
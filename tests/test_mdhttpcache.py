@@ -0,0 +1,128 @@
+"""
+Tests for mdhttpcache against a local stub HTTP server that
+serves ETag / Last-Modified validators and answers conditional
+requests with 304. Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from mdhttpcache import cache_key, cached_get, evict_cache, read_entry, write_entry
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Oct 2025 00:00:00 GMT"
+BODY = b'[{"county": "Allegany"}]'
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves BODY with validators, or 304 when a validator matches."""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if (self.headers.get("If-None-Match") == ETAG
+                or self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def url(stub_server):
+    return f"http://127.0.0.1:{stub_server.server_port}/resource/abcd-1234.json"
+
+def test_first_get_stores_body_and_validators(stub_server, url, tmp_path):
+    with requests.Session() as session:
+        body, not_modified = cached_get(session, url, {"$limit": 10},
+                                        cache_dir=str(tmp_path))
+
+    assert (body, not_modified) == (BODY, False)
+    assert "If-None-Match" not in stub_server.requests[0]
+    entry = read_entry(str(tmp_path), cache_key(url, {"$limit": 10}))
+    assert entry["etag"] == ETAG
+    assert entry["last_modified"] == LAST_MODIFIED
+    assert entry["size"] == len(BODY)
+
+def test_conditional_headers_sent_and_304_served_from_cache(stub_server, url,
+                                                            tmp_path):
+    with requests.Session() as session:
+        cached_get(session, url, cache_dir=str(tmp_path))
+        body, not_modified = cached_get(session, url, cache_dir=str(tmp_path))
+
+    assert (body, not_modified) == (BODY, True)
+    conditional = stub_server.requests[1]
+    assert conditional["If-None-Match"] == ETAG
+    assert conditional["If-Modified-Since"] == LAST_MODIFIED
+
+def test_other_params_are_not_conditional(stub_server, url, tmp_path):
+    with requests.Session() as session:
+        cached_get(session, url, {"$offset": 0}, cache_dir=str(tmp_path))
+        body, not_modified = cached_get(session, url, {"$offset": 1000},
+                                        cache_dir=str(tmp_path))
+
+    assert not_modified is False
+    assert "If-None-Match" not in stub_server.requests[1]
+
+def store(cache_dir, key, size, used_at):
+    write_entry(cache_dir, key,
+                {"etag": ETAG, "size": size, "stored_at": used_at,
+                 "used_at": used_at},
+                b"x" * size)
+
+def test_evicts_entries_older_than_max_age(tmp_path):
+    cache_dir = str(tmp_path)
+    now = time.time()
+    store(cache_dir, "stale", 10, now - 3600)
+    store(cache_dir, "fresh", 10, now)
+
+    assert evict_cache(cache_dir, max_bytes=1000, max_age=60) == 1
+    assert read_entry(cache_dir, "stale") is None
+    assert read_entry(cache_dir, "fresh") is not None
+    assert not os.path.exists(os.path.join(cache_dir, "stale.body"))
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path):
+    cache_dir = str(tmp_path)
+    now = time.time()
+    store(cache_dir, "oldest", 40, now - 30)
+    store(cache_dir, "middle", 40, now - 20)
+    store(cache_dir, "newest", 40, now - 10)
+
+    assert evict_cache(cache_dir, max_bytes=100, max_age=3600) == 1
+    assert read_entry(cache_dir, "oldest") is None
+    assert read_entry(cache_dir, "middle") is not None
+    assert read_entry(cache_dir, "newest") is not None
+
+def test_304_refreshes_use_time_against_eviction(stub_server, url, tmp_path):
+    cache_dir = str(tmp_path)
+    key = cache_key(url)
+    with requests.Session() as session:
+        cached_get(session, url, cache_dir=cache_dir)
+        entry = read_entry(cache_dir, key)
+        write_entry(cache_dir, key, dict(entry, used_at=time.time() - 3600))
+        cached_get(session, url, cache_dir=cache_dir)
+
+    assert evict_cache(cache_dir, max_bytes=1000, max_age=60) == 0
+    assert read_entry(cache_dir, key) is not None